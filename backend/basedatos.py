@@ -0,0 +1,58 @@
+# ───── BASE DE DATOS ─────
+# Ajustes de SQLite para producción y reintentos ante bloqueos transitorios.
+#
+# Con varios workers (gunicorn) sobre el mismo archivo SQLite, el modo WAL deja
+# que los lectores no esperen a los escritores, busy_timeout hace que un
+# escritor espere el lock en lugar de fallar en el acto, synchronous=NORMAL es
+# seguro con WAL y evita un fsync por commit, y mmap_size sirve las lecturas
+# desde memoria mapeada. Aun así un escritor puede recibir "database is
+# locked" (p. ej. al promover una lectura a escritura con otro commit en
+# curso): esas transacciones se repiten con con_reintentos().
+import time
+import random
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+ERRORES_TRANSITORIOS = (
+    'database is locked',
+    'database table is locked',
+    'database is busy',
+    'deadlock detected',            # PostgreSQL
+    'could not serialize access',   # PostgreSQL
+)
+
+def normalizar_uri(uri):
+    # Heroku y similares todavía exportan postgres://, que SQLAlchemy no acepta
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def configurar_sqlite(engine, busy_timeout_ms=5000, mmap_bytes=256 * 1024 * 1024):
+    # Se aplica a cada conexión nueva del pool
+    @event.listens_for(engine, 'connect')
+    def _pragmas(dbapi_conn, _registro):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        cursor.close()
+
+def es_error_transitorio(error):
+    if not isinstance(error, DBAPIError):
+        return False
+    mensaje = str(getattr(error, 'orig', error)).lower()
+    return any(m in mensaje for m in ERRORES_TRANSITORIOS)
+
+def con_reintentos(session, fn, intentos=5, espera=0.05):
+    # Ejecuta fn() (que debe terminar con commit) y, si falla por un bloqueo
+    # transitorio, hace rollback y la repite con espera exponencial. fn tiene
+    # que poder repetirse: todo lo que escriba en la sesión, dentro de fn.
+    for intento in range(1, intentos + 1):
+        try:
+            return fn()
+        except DBAPIError as e:
+            session.rollback()
+            if intento == intentos or not es_error_transitorio(e):
+                raise
+            time.sleep(espera * 2 ** (intento - 1) * (0.5 + random.random()))
@@ -0,0 +1,8 @@
+# ───── BENCHMARKS ─────
+# Generador de datos sintéticos y driver de carga para medir los endpoints.
+#
+#   python -m bench generar --escala pequena --db /tmp/bench.db
+#   python -m bench carga --db /tmp/bench.db --salida resultados.json
+#   python -m bench carga --url http://localhost:5000 --salida http.json
+#   python -m bench arranque --db /tmp/bench.db --salida arranque.json
+#   python -m bench comparar antes.json despues.json
@@ -0,0 +1,74 @@
+# Uso: python -m bench {generar,carga,arranque,comparar} ... (desde backend/)
+import sys
+import json
+import argparse
+
+from bench import generador, carga, arranque
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description="Benchmarks del backend de Paratodos")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('generar', help="llena una base nueva con datos sintéticos")
+    p.add_argument('--db', required=True, help="ruta del archivo SQLite a crear")
+    p.add_argument('--escala', choices=sorted(generador.ESCALAS), default='pequena')
+    p.add_argument('--tiendas', type=int, help="sobrescribe la escala")
+    p.add_argument('--productos', type=int, help="sobrescribe la escala")
+    p.add_argument('--leads', type=int, help="sobrescribe la escala")
+    p.add_argument('--semilla', type=int, default=42)
+
+    p = sub.add_parser('carga', help="mide los endpoints y guarda un reporte JSON")
+    p.add_argument('--db', required=True, help="base generada (en modo HTTP, la misma que usa el servidor)")
+    p.add_argument('--url', help="modo HTTP contra un servidor ya levantado, p. ej. http://localhost:5000")
+    p.add_argument('--peticiones', type=int, default=200, help="peticiones medidas por endpoint")
+    p.add_argument('--concurrencia', type=int, default=1)
+    p.add_argument('--calentamiento', type=int, default=5)
+    p.add_argument('--semilla', type=int, default=42)
+    p.add_argument('--solo', nargs='*', help="sólo estos endpoints (nombres del reporte)")
+    p.add_argument('--sin-cache', action='store_true', help="desactiva la caché de respuestas (sólo en proceso)")
+    p.add_argument('--salida', help="archivo JSON del reporte (por defecto, a stdout)")
+
+    p = sub.add_parser('arranque', help="mide importar la app y la primera petición en procesos nuevos")
+    p.add_argument('--db', required=True, help="base generada")
+    p.add_argument('--backend', help="directorio backend/ a medir (por defecto, este)")
+    p.add_argument('--muestras', type=int, default=10)
+    p.add_argument('--ruta', default='/api/tiendas', help="ruta de la primera petición")
+    p.add_argument('--salida', help="archivo JSON del reporte (por defecto, a stdout)")
+
+    p = sub.add_parser('comparar', help="diferencias entre dos reportes")
+    p.add_argument('antes')
+    p.add_argument('despues')
+
+    args = parser.parse_args()
+    if args.comando == 'generar':
+        escala = dict(generador.ESCALAS[args.escala])
+        for clave in ('tiendas', 'productos', 'leads'):
+            if getattr(args, clave) is not None:
+                escala[clave] = getattr(args, clave)
+        generador.generar(args.db, semilla=args.semilla, progreso=lambda m: print(m, file=sys.stderr), **escala)
+    elif args.comando in ('carga', 'arranque'):
+        if args.comando == 'carga':
+            reporte = carga.correr(
+                args.db, url=args.url, peticiones=args.peticiones, concurrencia=args.concurrencia,
+                calentamiento=args.calentamiento, semilla=args.semilla, solo=args.solo,
+                sin_cache=args.sin_cache, progreso=lambda m: print(m, file=sys.stderr)
+            )
+        else:
+            reporte = arranque.correr(
+                args.db, backend=args.backend, muestras=args.muestras, ruta=args.ruta,
+                progreso=lambda m: print(m, file=sys.stderr)
+            )
+        texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if args.salida:
+            with open(args.salida, 'w') as f:
+                f.write(texto + "\n")
+        else:
+            print(texto)
+    else:
+        with open(args.antes) as a, open(args.despues) as d:
+            antes, despues = json.load(a), json.load(d)
+        modulo = arranque if 'arranque' in despues else carga
+        print(modulo.comparar(antes, despues))
+
+if __name__ == '__main__':
+    main()
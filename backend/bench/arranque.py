@@ -0,0 +1,108 @@
+# ───── TIEMPO DE ARRANQUE ─────
+# Mide lo que paga un worker nuevo (cold start, p. ej. al escalar desde cero):
+# importar la app y servir la primera petición. Cada muestra es un proceso
+# Python nuevo; la primera ejecución se descarta para no medir la compilación
+# de los .pyc. Con --backend se mide otra copia del repo, así se comparan dos
+# revisiones sobre la misma base:
+#
+#   git worktree add /tmp/antes HEAD~1
+#   python -m bench arranque --db /tmp/bench.db --backend /tmp/antes/backend --salida antes.json
+#   python -m bench arranque --db /tmp/bench.db --salida despues.json
+#   python -m bench comparar antes.json despues.json
+import os
+import sys
+import json
+import time
+import datetime
+import subprocess
+
+from bench.carga import percentil, revision_git
+
+# Se ejecuta dentro del proceso medido, con cwd en el backend
+PROGRAMA = r'''
+import os, sys, json, time
+inicio = time.perf_counter()
+import app as m
+importado = time.perf_counter()
+r = m.app.test_client().get(sys.argv[1])
+r.get_data()
+r.close()
+fin = time.perf_counter()
+print(json.dumps({
+    "importar_ms": (importado - inicio) * 1000,
+    "primera_peticion_ms": (fin - importado) * 1000,
+    "estado": r.status_code,
+    "modulos": len(sys.modules),
+    "ia_cargada": "openai" in sys.modules,
+    "pdf_cargado": "PyPDF2" in sys.modules,
+}))
+sys.stdout.flush()
+os._exit(0) # sin esperar a los hilos de fondo: el apagado no es parte del arranque
+'''
+
+FASES = ('importar', 'primera_peticion', 'proceso')
+
+def medir(backend, ruta_db, ruta):
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.abspath(ruta_db))
+    inicio = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-c', PROGRAMA, ruta], cwd=backend, env=env,
+        capture_output=True, text=True, timeout=300
+    )
+    total = (time.perf_counter() - inicio) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"El proceso medido falló:\n{proc.stderr[-2000:]}")
+    muestra = json.loads(proc.stdout.strip().splitlines()[-1])
+    muestra["proceso_ms"] = total
+    return muestra
+
+def resumir(valores):
+    valores = sorted(valores)
+    return {
+        "p50_ms": round(percentil(valores, 50), 1),
+        "p95_ms": round(percentil(valores, 95), 1),
+        "min_ms": round(valores[0], 1),
+        "max_ms": round(valores[-1], 1),
+        "media_ms": round(sum(valores) / len(valores), 1),
+    }
+
+def correr(ruta_db, backend=None, muestras=10, ruta='/api/tiendas', progreso=print):
+    if not os.path.exists(ruta_db):
+        raise FileNotFoundError(f"{ruta_db} no existe; usar primero 'generar'")
+    backend = os.path.abspath(backend or os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    medir(backend, ruta_db, ruta) # calentamiento: .pyc y caché de disco
+    resultados = []
+    for i in range(muestras):
+        resultados.append(medir(backend, ruta_db, ruta))
+        r = resultados[-1]
+        progreso(f"muestra {i + 1:>3}: importar={r['importar_ms']:>7.1f}ms "
+                 f"primera={r['primera_peticion_ms']:>7.1f}ms proceso={r['proceso_ms']:>7.1f}ms")
+    return {
+        "meta": {
+            "fecha": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            "git": revision_git(backend),
+            "backend": backend,
+            "db": os.path.abspath(ruta_db),
+            "ruta": ruta,
+            "muestras": muestras,
+            "python": sys.version.split()[0],
+        },
+        "arranque": { fase: resumir([r[f"{fase}_ms"] for r in resultados]) for fase in FASES },
+        "estados": sorted({r["estado"] for r in resultados}),
+        "modulos": resultados[-1]["modulos"],
+        "ia_cargada": resultados[-1]["ia_cargada"],
+        "pdf_cargado": resultados[-1]["pdf_cargado"],
+    }
+
+def comparar(antes, despues):
+    lineas = [f"{'fase':<18} {'p50 antes':>10} {'p50 ahora':>10} {'Δ%':>7} {'p95 antes':>10} {'p95 ahora':>10} {'Δ%':>7}"]
+    for fase in FASES:
+        a, r = antes["arranque"][fase], despues["arranque"][fase]
+        def delta(clave):
+            return (r[clave] - a[clave]) / a[clave] * 100 if a[clave] else 0.0
+        lineas.append(
+            f"{fase:<18} {a['p50_ms']:>10.1f} {r['p50_ms']:>10.1f} {delta('p50_ms'):>+6.1f}% "
+            f"{a['p95_ms']:>10.1f} {r['p95_ms']:>10.1f} {delta('p95_ms'):>+6.1f}%"
+        )
+    lineas.append(f"{'módulos':<18} {antes['modulos']:>10} {despues['modulos']:>10}")
+    return "\n".join(lineas)
@@ -0,0 +1,235 @@
+# ───── DRIVER DE CARGA ─────
+# Lanza peticiones contra cada endpoint y mide latencia, throughput, tamaño de
+# respuesta y, en modo en proceso, consultas SQL por petición (contadas con un
+# listener before_cursor_execute sobre el engine de la app, por hilo para que
+# el flush del buffer de leads no se cuele en la cuenta).
+#
+# Modo en proceso: Flask test client, sin red; mide la app y la base.
+# Modo HTTP: urllib contra un servidor ya levantado (gunicorn, flask run...).
+import os
+import time
+import random
+import threading
+import subprocess
+import datetime
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+PALABRAS_BUSQUEDA = ("bisagra", "zapato dep", "cable", "mesa madera", "led", "cocina negro")
+
+def escenarios(tiendas, tienda_de, rnd):
+    # (nombre, método, función que genera ruta y cuerpo). Los ids salen de la
+    # base generada: tiendas 1..N y tienda_de[producto_id] = tienda del producto
+    productos = len(tienda_de) - 1
+    def slug():
+        return f"tienda-{rnd.randint(1, tiendas)}"
+    def producto_id():
+        return rnd.randint(1, productos)
+    return [
+        ('tiendas', 'GET', lambda: ('/api/tiendas', None)),
+        ('tienda', 'GET', lambda: (f'/api/tienda/{slug()}', None)),
+        ('productos_tienda', 'GET', lambda: (f'/api/productos/{slug()}', None)),
+        ('producto', 'GET', lambda: (f'/api/producto/{producto_id()}', None)),
+        ('productos_pagina', 'GET', lambda: ('/api/productos?limit=50', None)),
+        ('productos_grid', 'GET', lambda: ('/api/productos?limit=50&fields=id,nombre,precio,imagen_variantes', None)),
+        ('productos_cursor', 'GET', lambda: (f'/api/productos?limit=50&after={producto_id()}', None)),
+        ('productos_precio', 'GET', lambda: (
+            f'/api/productos?limit=50&orden=precio&min_precio={rnd.randint(1, 50)}&max_precio={rnd.randint(60, 500)}', None
+        )),
+        ('buscar', 'GET', lambda: (f'/api/buscar?q={rnd.choice(PALABRAS_BUSQUEDA).replace(" ", "+")}', None)),
+        ('leads_tienda', 'GET', lambda: (f'/api/leads/{slug()}', None)),
+        ('analitica_leads', 'GET', lambda: (f'/api/leads/{slug()}/analitica?dias=30', None)),
+        ('crear_lead', 'POST', lambda: ('/api/leads', _cuerpo_lead(tienda_de, producto_id()))),
+    ]
+
+def _cuerpo_lead(tienda_de, producto_id):
+    return {"producto_id": producto_id, "tienda_id": tienda_de[producto_id]}
+
+# ───── CONTEO DE CONSULTAS ─────
+
+class ContadorConsultas:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args, **kwargs):
+        self._local.n = getattr(self._local, 'n', 0) + 1
+
+    def reiniciar(self):
+        self._local.n = 0
+
+    def leer(self):
+        return getattr(self._local, 'n', 0)
+
+# ───── CLIENTES ─────
+
+class ClienteEnProceso:
+    modo = 'en_proceso'
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.contador = ContadorConsultas(engine)
+        self._local = threading.local()
+
+    def _cliente(self):
+        # El test client no es seguro entre hilos: uno por hilo
+        if not hasattr(self._local, 'cliente'):
+            self._local.cliente = self.app.test_client()
+        return self._local.cliente
+
+    def peticion(self, metodo, ruta, cuerpo):
+        self.contador.reiniciar()
+        inicio = time.perf_counter()
+        r = self._cliente().open(ruta, method=metodo, json=cuerpo)
+        datos = r.get_data() # consume respuestas en streaming dentro de la medición
+        segundos = time.perf_counter() - inicio
+        r.close() # como haría un servidor WSGI (cierra el contexto y las métricas del streaming)
+        return r.status_code, len(datos), segundos, self.contador.leer()
+
+class ClienteHttp:
+    modo = 'http'
+
+    def __init__(self, url_base, timeout=30):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+
+    def peticion(self, metodo, ruta, cuerpo):
+        import json
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        req = urllib.request.Request(self.url_base + ruta, data=datos, method=metodo)
+        if datos is not None:
+            req.add_header('Content-Type', 'application/json')
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as r:
+                contenido, estado = r.read(), r.status
+        except urllib.error.HTTPError as e:
+            contenido, estado = e.read(), e.code
+        return estado, len(contenido), time.perf_counter() - inicio, None
+
+# ───── EJECUCIÓN ─────
+
+def percentil(valores_ordenados, p):
+    # Rango más cercano; valores_ordenados no vacío
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados) + 0.5)) - 1))
+    return valores_ordenados[indice]
+
+def resumir(muestras, segundos_totales):
+    latencias = sorted(m[2] * 1000 for m in muestras)
+    consultas = [m[3] for m in muestras if m[3] is not None]
+    errores = sum(1 for m in muestras if m[0] >= 400)
+    return {
+        "peticiones": len(muestras),
+        "errores": errores,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(latencias[-1], 3),
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "rps": round(len(muestras) / segundos_totales, 1) if segundos_totales else None,
+        "consultas_por_peticion": round(sum(consultas) / len(consultas), 2) if consultas else None,
+        "bytes_medios": int(sum(m[1] for m in muestras) / len(muestras)),
+        "estados": sorted({m[0] for m in muestras}),
+    }
+
+def ejecutar(cliente, lista, peticiones, concurrencia=1, calentamiento=5, solo=None, progreso=print):
+    resultados = {}
+    for nombre, metodo, generar in lista:
+        if solo and nombre not in solo:
+            continue
+        for _ in range(calentamiento):
+            cliente.peticion(metodo, *generar())
+        # Las rutas se generan antes para no medir el generador aleatorio
+        trabajos = [generar() for _ in range(peticiones)]
+        inicio = time.perf_counter()
+        if concurrencia <= 1:
+            muestras = [cliente.peticion(metodo, ruta, cuerpo) for ruta, cuerpo in trabajos]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+                muestras = list(pool.map(lambda t: cliente.peticion(metodo, *t), trabajos))
+        resultados[nombre] = resumir(muestras, time.perf_counter() - inicio)
+        r = resultados[nombre]
+        progreso(f"{nombre:<18} p50={r['p50_ms']:>8.2f}ms p99={r['p99_ms']:>8.2f}ms "
+                 f"rps={r['rps']:>8} sql={r['consultas_por_peticion']} errores={r['errores']}")
+    return resultados
+
+def leer_base(ruta_db):
+    # Conteos para el reporte y tienda de cada producto para crear_lead
+    import sqlite3
+    conn = sqlite3.connect(ruta_db)
+    try:
+        filas = {
+            tabla: conn.execute(f"SELECT count(*) FROM {tabla}").fetchone()[0]
+            for tabla in ('tienda', 'producto', 'lead')
+        }
+        maximo = conn.execute("SELECT coalesce(max(id), 0) FROM producto").fetchone()[0]
+        tienda_de = [None] * (maximo + 1)
+        for producto_id, tienda_id in conn.execute("SELECT id, tienda_id FROM producto"):
+            tienda_de[producto_id] = tienda_id
+        return filas, tienda_de
+    finally:
+        conn.close()
+
+def revision_git(directorio=None):
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=directorio or os.path.dirname(os.path.abspath(__file__)), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def correr(ruta_db, url=None, peticiones=200, concurrencia=1, calentamiento=5,
+           semilla=42, solo=None, sin_cache=False, progreso=print):
+    # En modo HTTP la base se lee sólo para elegir ids (la misma que usa el servidor)
+    filas, tienda_de = leer_base(ruta_db)
+    if not filas['tienda'] or not filas['producto']:
+        raise ValueError(f"{ruta_db} no tiene tiendas o productos; usar primero 'generar'")
+    if url:
+        cliente = ClienteHttp(url)
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(ruta_db)
+        if sin_cache:
+            os.environ['CACHE_RESPUESTAS_TTL'] = '0'
+        from app import app, db
+        with app.app_context():
+            cliente = ClienteEnProceso(app, db.engine)
+    lista = escenarios(filas['tienda'], tienda_de, random.Random(semilla))
+
+    inicio = time.perf_counter()
+    resultados = ejecutar(cliente, lista, peticiones, concurrencia, calentamiento, solo, progreso)
+    return {
+        "meta": {
+            "fecha": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            "git": revision_git(),
+            "modo": cliente.modo,
+            "url": url,
+            "db": os.path.abspath(ruta_db),
+            "filas": filas,
+            "peticiones": peticiones,
+            "concurrencia": concurrencia,
+            "semilla": semilla,
+            "cache_respuestas": not sin_cache,
+            "segundos": round(time.perf_counter() - inicio, 2),
+        },
+        "endpoints": resultados,
+    }
+
+def comparar(antes, despues):
+    # Tabla de diferencias entre dos reportes (positivo = más lento)
+    lineas = [f"{'endpoint':<18} {'p50 antes':>10} {'p50 ahora':>10} {'Δ%':>7} {'p99 antes':>10} {'p99 ahora':>10} {'Δ%':>7} {'sql':>9}"]
+    for nombre, r in despues["endpoints"].items():
+        a = antes["endpoints"].get(nombre)
+        if not a:
+            lineas.append(f"{nombre:<18} (nuevo)")
+            continue
+        def delta(clave):
+            return (r[clave] - a[clave]) / a[clave] * 100 if a[clave] else 0.0
+        sql = f"{a['consultas_por_peticion']}→{r['consultas_por_peticion']}"
+        lineas.append(
+            f"{nombre:<18} {a['p50_ms']:>10.2f} {r['p50_ms']:>10.2f} {delta('p50_ms'):>+6.1f}% "
+            f"{a['p99_ms']:>10.2f} {r['p99_ms']:>10.2f} {delta('p99_ms'):>+6.1f}% {sql:>9}"
+        )
+    return "\n".join(lineas)
@@ -0,0 +1,137 @@
+# ───── GENERADOR DE DATOS SINTÉTICOS ─────
+# Llena una base nueva con tiendas, productos y leads reproducibles (misma
+# semilla, mismos datos). Las fechas de los leads se cuentan hacia atrás desde
+# el día en que se genera, igual que la analítica (últimos ?dias= hasta hoy):
+# con la misma semilla cambia el día de referencia, no la distribución. El esquema lo crea la propia app (create_all y
+# migraciones) y las filas se insertan con sqlite3 en lotes, sin ORM, para
+# llegar a millones de filas en minutos.
+import os
+import random
+import sqlite3
+import datetime
+
+ESCALAS = {
+    'pequena': { 'tiendas': 100, 'productos': 10_000, 'leads': 100_000 },
+    'mediana': { 'tiendas': 1_000, 'productos': 100_000, 'leads': 1_000_000 },
+    'grande': { 'tiendas': 10_000, 'productos': 1_000_000, 'leads': 10_000_000 },
+}
+
+TAMANO_LOTE = 50_000
+DIAS_LEADS = 90
+
+PALABRAS = (
+    "bisagra riel cazoleta tornillo manilla gaveta closet cocina puerta ventana "
+    "zapato deportivo running cuero lona camisa pantalón chaqueta gorra bolso "
+    "mouse teclado monitor cable cargador audífonos parlante lámpara led mesa "
+    "silla escritorio estante cama colchón almohada sábana toalla cortina"
+).split()
+ADJETIVOS = "negro blanco rojo azul acero aluminio madera premium económico grande pequeño reforzado".split()
+FORMATOS_PRECIO = ("${:.2f}", "{:.2f} USD", "Bs. {:,.2f}", "REF {:.0f}", "{:.2f}$")
+
+def crear_esquema(ruta_db):
+    # Crea tablas, índices e índice de búsqueda con la app, exactamente como
+    # `flask crear-esquema` en producción
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(ruta_db)
+    from app import app, db
+    from modelos import preparar_esquema
+    with app.app_context():
+        preparar_esquema()
+        db.engine.dispose()
+
+def _nombre(rnd):
+    return f"{rnd.choice(PALABRAS).capitalize()} {rnd.choice(PALABRAS)} {rnd.choice(ADJETIVOS)}"
+
+def _precio(rnd):
+    # Texto con los formatos que escriben las tiendas; precio_valor lo calcula
+    # parsear_precio igual que en la app
+    return rnd.choice(FORMATOS_PRECIO).format(round(rnd.lognormvariate(3, 1.2), 2))
+
+def _lotes(filas):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def generar(ruta_db, tiendas, productos, leads, semilla=42, progreso=print):
+    if os.path.exists(ruta_db):
+        raise FileExistsError(f"{ruta_db} ya existe; el generador sólo llena bases nuevas")
+    crear_esquema(ruta_db)
+    from precios import parsear_precio
+
+    rnd = random.Random(semilla)
+    conn = sqlite3.connect(ruta_db)
+    # Carga masiva: sin journal ni fsync (si se corta, se vuelve a generar)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+
+    conn.executemany(
+        "INSERT INTO tienda (id, nombre, slug, responsable, rif, email, telefono, instagram, direccion, productos, color, logo, catalogo) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"Tienda {i}", f"tienda-{i}", f"Responsable {i}", f"J-{rnd.randint(10**7, 10**8)}",
+             f"tienda{i}@ejemplo.com", f"+58 412 {rnd.randint(10**6, 10**7 - 1)}", f"@tienda{i}",
+             f"Calle {rnd.randint(1, 200)}", "varios", "#%06x" % rnd.randint(0, 0xFFFFFF), "", "")
+            for i in range(1, tiendas + 1)
+        )
+    )
+    conn.commit()
+    progreso(f"tiendas: {tiendas}")
+
+    def filas_productos():
+        for i in range(1, productos + 1):
+            texto = _precio(rnd)
+            nombre = _nombre(rnd)
+            descripcion = " ".join(rnd.choice(PALABRAS + ADJETIVOS) for _ in range(rnd.randint(8, 30)))
+            yield (i, nombre, descripcion, texto, parsear_precio(texto), rnd.randint(1, tiendas), "", "")
+
+    hechos = 0
+    for lote in _lotes(filas_productos()):
+        conn.executemany(
+            "INSERT INTO producto (id, nombre, descripcion, precio, precio_valor, tienda_id, relacionados, imagen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", lote
+        )
+        conn.commit()
+        hechos += len(lote)
+        progreso(f"productos: {hechos}/{productos}")
+
+    # Cada producto pertenece a una tienda; el lead tiene que respetarlo
+    tienda_de = [0] * (productos + 1)
+    for producto_id, tienda_id in conn.execute("SELECT id, tienda_id FROM producto"):
+        tienda_de[producto_id] = tienda_id
+    # Medianoche UTC de hoy: los leads cubren los DIAS_LEADS días anteriores
+    hoy = datetime.datetime.combine(datetime.datetime.utcnow().date(), datetime.time())
+
+    def filas_leads():
+        for _ in range(leads):
+            # Distribución sesgada: pocos productos concentran muchos leads
+            producto_id = min(productos, int(rnd.paretovariate(1.2))) if rnd.random() < 0.3 else rnd.randint(1, productos)
+            fecha = hoy - datetime.timedelta(seconds=rnd.randint(0, DIAS_LEADS * 86400))
+            yield (producto_id, tienda_de[producto_id], fecha.strftime("%Y-%m-%d %H:%M:%S.000000"), "pendiente")
+
+    hechos = 0
+    for lote in _lotes(filas_leads()):
+        conn.executemany("INSERT INTO lead (producto_id, tienda_id, fecha, estado) VALUES (?, ?, ?, ?)", lote)
+        conn.commit()
+        hechos += len(lote)
+        progreso(f"leads: {hechos}/{leads}")
+
+    progreso("rollup de leads e índice de búsqueda...")
+    conn.execute("DELETE FROM lead_diario")
+    conn.execute(
+        "INSERT INTO lead_diario (tienda_id, dia, producto_id, total) "
+        "SELECT tienda_id, date(fecha), producto_id, count(*) FROM lead GROUP BY tienda_id, date(fecha), producto_id"
+    )
+    conn.execute("DELETE FROM producto_fts")
+    conn.execute(
+        "INSERT INTO producto_fts (rowid, nombre, descripcion, tienda, tienda_id) "
+        "SELECT p.id, p.nombre, p.descripcion, t.nombre, p.tienda_id FROM producto p LEFT JOIN tienda t ON t.id = p.tienda_id"
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    progreso(f"listo: {ruta_db}")
@@ -0,0 +1,115 @@
+# ───── BÚSQUEDA DE PRODUCTOS (SQLite FTS5) ─────
+# Índice de texto completo sobre nombre y descripción del producto y nombre de
+# la tienda. El rowid de producto_fts es el id del producto, así que
+# actualizar un producto es borrar e insertar su fila.
+# FTS5 es exclusivo de SQLite: con otra base (DATABASE_URL=postgresql://...)
+# el índice no se mantiene y buscar() recurre a un ILIKE sobre producto.
+import re
+from sqlalchemy import text
+
+TABLA_FTS = "producto_fts"
+# Pesos bm25 por columna: nombre, descripcion, tienda
+PESOS_BM25 = (10.0, 1.0, 3.0)
+TAMANO_LOTE = 500 # ids por sentencia, por debajo del límite de variables de SQLite
+
+def soportado(session):
+    return session.get_bind().dialect.name == 'sqlite'
+
+def existe_indice(session):
+    fila = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {"nombre": TABLA_FTS}
+    ).first()
+    return fila is not None
+
+def crear_indice(session):
+    # Devuelve True si la tabla no existía (hay que poblarla)
+    if not soportado(session) or existe_indice(session):
+        return False
+    session.execute(text(f"""
+        CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5(
+            nombre, descripcion, tienda, tienda_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """))
+    return True
+
+_SELECT_FILAS = f"""
+    INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, tienda, tienda_id)
+    SELECT p.id, coalesce(p.nombre, ''), coalesce(p.descripcion, ''), coalesce(t.nombre, ''), p.tienda_id
+    FROM producto p LEFT JOIN tienda t ON t.id = p.tienda_id
+"""
+
+def indexar_productos(session, ids):
+    # Sincroniza las filas de los productos indicados (altas, ediciones y bajas)
+    if not soportado(session):
+        return
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        marcadores = ", ".join(f":id{n}" for n in range(len(lote)))
+        params = {f"id{n}": producto_id for n, producto_id in enumerate(lote)}
+        session.execute(text(f"DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcadores})"), params)
+        session.execute(text(f"{_SELECT_FILAS} WHERE p.id IN ({marcadores})"), params)
+
+def reconstruir_indice(session):
+    if not soportado(session):
+        return
+    crear_indice(session)
+    session.execute(text(f"DELETE FROM {TABLA_FTS}"))
+    session.execute(text(_SELECT_FILAS))
+    session.execute(text(f"INSERT INTO {TABLA_FTS} ({TABLA_FTS}) VALUES ('optimize')"))
+
+def construir_consulta(q):
+    # Cada palabra se busca como prefijo ("bisa" encuentra "bisagra") y todas
+    # deben aparecer. Las comillas evitan que la entrada del usuario se
+    # interprete como sintaxis de FTS5 (NEAR, OR, columnas...).
+    palabras = re.findall(r"\w+", q or "")
+    if not palabras:
+        return None
+    return " ".join(f'"{p}"*' for p in palabras)
+
+def buscar(session, q, tienda_id=None, limit=20):
+    consulta = construir_consulta(q)
+    if consulta is None:
+        return []
+    if not soportado(session):
+        return _buscar_sin_fts(session, q, tienda_id, limit)
+    filtro_tienda = f"AND {TABLA_FTS}.tienda_id = :tienda_id" if tienda_id is not None else ""
+    pesos = ", ".join(str(p) for p in PESOS_BM25)
+    sql = f"""
+        SELECT p.id, p.nombre, p.descripcion, p.precio, p.imagen, p.tienda_id,
+               t.slug, t.nombre AS tienda, bm25({TABLA_FTS}, {pesos}) AS rank
+        FROM {TABLA_FTS}
+        JOIN producto p ON p.id = {TABLA_FTS}.rowid
+        LEFT JOIN tienda t ON t.id = p.tienda_id
+        WHERE {TABLA_FTS} MATCH :consulta {filtro_tienda}
+        ORDER BY rank
+        LIMIT :limit
+    """
+    params = {"consulta": consulta, "limit": limit}
+    if tienda_id is not None:
+        params["tienda_id"] = tienda_id
+    return session.execute(text(sql), params).mappings().all()
+
+def _buscar_sin_fts(session, q, tienda_id, limit):
+    # Respaldo para bases sin FTS5: todas las palabras como subcadena, sin ranking
+    condiciones, params = [], {"limit": limit}
+    for n, palabra in enumerate(re.findall(r"\w+", q)):
+        condiciones.append(
+            f"(p.nombre ILIKE :p{n} OR p.descripcion ILIKE :p{n} OR t.nombre ILIKE :p{n})"
+        )
+        params[f"p{n}"] = f"%{palabra}%"
+    if tienda_id is not None:
+        condiciones.append("p.tienda_id = :tienda_id")
+        params["tienda_id"] = tienda_id
+    sql = f"""
+        SELECT p.id, p.nombre, p.descripcion, p.precio, p.imagen, p.tienda_id,
+               t.slug, t.nombre AS tienda
+        FROM producto p LEFT JOIN tienda t ON t.id = p.tienda_id
+        WHERE {" AND ".join(condiciones)}
+        ORDER BY p.id
+        LIMIT :limit
+    """
+    return session.execute(text(sql), params).mappings().all()
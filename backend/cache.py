@@ -0,0 +1,79 @@
+# ───── CACHÉ DE RESPUESTAS HTTP ─────
+# Caché en memoria del proceso para endpoints de lectura: LRU con TTL y
+# etiquetas para invalidar por tienda. Cada worker tiene la suya; el TTL acota
+# cuánto puede tardar un worker en ver un cambio hecho desde otro.
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# comprimidos: codificación -> cuerpo comprimido, calculado la primera vez que se pide
+Entrada = namedtuple('Entrada', ['cuerpo', 'mimetype', 'etag', 'expira', 'etiquetas', 'comprimidos'])
+
+def calcular_etag(cuerpo):
+    return hashlib.sha256(cuerpo).hexdigest()[:32]
+
+class CacheRespuestas:
+    def __init__(self, max_entradas=512, ttl=300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()   # clave -> Entrada, en orden de uso
+        self._por_etiqueta = {}       # etiqueta -> claves que dependen de ella
+        self._generaciones = {}       # etiqueta -> nº de invalidaciones
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada.expira <= time.monotonic():
+                self._quitar(clave)
+                return None
+            self._datos.move_to_end(clave)
+            return entrada
+
+    def version(self, etiquetas):
+        # Se toma antes de generar la respuesta; si entre medias se invalida
+        # alguna etiqueta, guardar() descarta el resultado ya obsoleto
+        with self._lock:
+            return tuple(self._generaciones.get(e, 0) for e in etiquetas)
+
+    def guardar(self, clave, cuerpo, mimetype, etiquetas, version):
+        entrada = Entrada(cuerpo, mimetype, calcular_etag(cuerpo), time.monotonic() + self.ttl, tuple(etiquetas), {})
+        with self._lock:
+            if version != tuple(self._generaciones.get(e, 0) for e in etiquetas):
+                return entrada
+            self._quitar(clave)
+            self._datos[clave] = entrada
+            for etiqueta in entrada.etiquetas:
+                self._por_etiqueta.setdefault(etiqueta, set()).add(clave)
+            while len(self._datos) > self.max_entradas:
+                self._quitar(next(iter(self._datos)))
+        return entrada
+
+    def invalidar(self, *etiquetas):
+        with self._lock:
+            for etiqueta in etiquetas:
+                self._generaciones[etiqueta] = self._generaciones.get(etiqueta, 0) + 1
+                for clave in list(self._por_etiqueta.get(etiqueta, ())):
+                    self._quitar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._por_etiqueta.clear()
+
+    def _quitar(self, clave):
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return
+        for etiqueta in entrada.etiquetas:
+            claves = self._por_etiqueta.get(etiqueta)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_etiqueta[etiqueta]
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,63 @@
+# ───── COMANDOS ─────
+# Tareas de mantenimiento con `flask <comando>` (desde backend/). El esquema ya
+# no se crea al arrancar la app: en un despliegue nuevo o tras actualizar,
+# `flask crear-esquema` antes de levantar los workers.
+from flask import current_app
+import migraciones
+import busqueda
+import recomendaciones
+from modelos import db, preparar_esquema, reconstruir_rollup_leads_db, LeadDiario
+from rutas.subidas import limpiar_subidas_db
+
+def registrar(app):
+    @app.cli.command('crear-esquema')
+    def crear_esquema():
+        """Crea las tablas e índices que falten y aplica las migraciones."""
+        aplicadas = preparar_esquema()
+        print(f"Esquema listo; migraciones aplicadas: {aplicadas}" if aplicadas else "Esquema listo")
+
+    @app.cli.command('migrar')
+    def migrar():
+        """Aplica las migraciones de esquema pendientes."""
+        aplicadas = migraciones.migrar(db.engine)
+        print(f"Migraciones aplicadas: {aplicadas}" if aplicadas else "El esquema ya está al día")
+
+    @app.cli.command('reconstruir-rollup-leads')
+    def reconstruir_rollup_leads():
+        """Recalcula la tabla lead_diario a partir de todos los leads."""
+        reconstruir_rollup_leads_db()
+        db.session.commit()
+        total = db.session.query(db.func.coalesce(db.func.sum(LeadDiario.total), 0)).scalar()
+        print(f"Rollup de leads reconstruido: {total} leads")
+
+    @app.cli.command('reindexar-busqueda')
+    def reindexar_busqueda():
+        """Reconstruye el índice de búsqueda de productos desde cero."""
+        if not busqueda.soportado(db.session):
+            print("La base de datos no es SQLite: la búsqueda usa ILIKE y no tiene índice")
+            return
+        busqueda.reconstruir_indice(db.session)
+        db.session.commit()
+        total = db.session.execute(db.text(f"SELECT count(*) FROM {busqueda.TABLA_FTS}")).scalar()
+        print(f"Índice de búsqueda reconstruido: {total} productos")
+
+    @app.cli.command('reconstruir-relacionados')
+    def reconstruir_relacionados():
+        """Recalcula los productos relacionados de todo el catálogo."""
+        if not recomendaciones.soportado(db.session):
+            print("Sin índice FTS5 (la base no es SQLite): no hay productos relacionados")
+            return
+
+        def progreso(hechos):
+            db.session.commit()
+            print(f"  {hechos} productos")
+
+        total = recomendaciones.reconstruir(db.session, k=current_app.config['RELACIONADOS_K'], progreso=progreso)
+        db.session.commit()
+        print(f"Productos relacionados recalculados: {total} productos")
+
+    @app.cli.command('limpiar-subidas')
+    def limpiar_subidas():
+        """Elimina las subidas por trozos abandonadas o ya usadas."""
+        borradas = limpiar_subidas_db(current_app.config['SUBIDA_EXPIRA_HORAS'])
+        print(f"Subidas eliminadas: {borradas}")
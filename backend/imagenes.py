@@ -0,0 +1,145 @@
+# ───── IMÁGENES ─────
+# Las imágenes subidas se guardan con el SHA-256 de su contenido como nombre
+# (<hash>.<ext>), así dos subidas iguales comparten archivo y la URL nunca
+# cambia de contenido: se puede cachear como immutable. Junto al original se
+# generan variantes reducidas en JPEG y WebP:
+#   <hash>-thumb.jpg  <hash>-thumb.webp  <hash>-medio.jpg  <hash>-medio.webp
+# Pillow es opcional: sin él se guarda sólo el original y las variantes se
+# sirven como el original.
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+from werkzeug.utils import secure_filename
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # pragma: no cover - Pillow es opcional
+    Image = None
+
+VARIANTES = { 'thumb': 320, 'medio': 960 } # lado mayor en píxeles
+FORMATOS_VARIANTE = { 'jpg': 'JPEG', 'webp': 'WEBP' }
+CALIDAD = 82
+EXTENSIONES = { 'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp' }
+FORMATO_A_EXTENSION = { 'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp', 'BMP': 'bmp' }
+
+PATRON_NOMBRE = re.compile(r'^([0-9a-f]{64})(?:-(thumb|medio))?\.([a-z0-9]+)$')
+
+def es_nombre_hash(filename):
+    return PATRON_NOMBRE.match(filename or '') is not None
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename or ''))[1].lower().lstrip('.')
+    return 'jpg' if ext == 'jpeg' else ext
+
+def guardar_imagen(archivo, directorio, tamano_bloque=64 * 1024):
+    # archivo: FileStorage (o cualquier objeto con .stream/.read y .filename).
+    # Copia a un temporal calculando el hash por bloques, sin cargarlo entero.
+    os.makedirs(directorio, exist_ok=True)
+    origen = getattr(archivo, 'stream', archivo)
+    h = hashlib.sha256()
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.subida')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            for bloque in iter(lambda: origen.read(tamano_bloque), b''):
+                h.update(bloque)
+                destino.write(bloque)
+        return _registrar(temporal, h.hexdigest(), _extension(getattr(archivo, 'filename', '')), directorio)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def mover_imagen(ruta, sha, filename, directorio):
+    # Para un archivo ya en disco con el hash calculado (subida por trozos):
+    # se mueve en lugar de copiarse
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.subida')
+    os.close(fd)
+    try:
+        shutil.move(ruta, temporal)
+        return _registrar(temporal, sha, _extension(filename), directorio)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def _registrar(temporal, sha, ext, directorio):
+    if Image is not None:
+        # El formato real manda sobre la extensión que trae el nombre
+        try:
+            with Image.open(temporal) as img:
+                ext = FORMATO_A_EXTENSION.get(img.format, ext)
+        except Exception:
+            raise ValueError("El archivo no es una imagen válida")
+    if ext not in EXTENSIONES:
+        raise ValueError("Formato de imagen no permitido")
+
+    nombre = f"{sha}.{ext}"
+    ruta = os.path.join(directorio, nombre)
+    if not os.path.exists(ruta):
+        os.replace(temporal, ruta)
+    generar_variantes(ruta)
+    return nombre
+
+def nombre_variante(nombre, variante, formato):
+    sha = PATRON_NOMBRE.match(nombre).group(1)
+    return f"{sha}-{variante}.{formato}"
+
+def generar_variantes(ruta):
+    # Idempotente: sólo crea las variantes que falten
+    if Image is None:
+        return
+    directorio, nombre = os.path.split(ruta)
+    faltan = [
+        (variante, formato)
+        for variante in VARIANTES for formato in FORMATOS_VARIANTE
+        if not os.path.exists(os.path.join(directorio, nombre_variante(nombre, variante, formato)))
+    ]
+    if not faltan:
+        return
+    with Image.open(ruta) as original:
+        original = ImageOps.exif_transpose(original)
+        for variante, formato in faltan:
+            lado = VARIANTES[variante]
+            img = original.copy()
+            img.thumbnail((lado, lado))
+            if formato == 'jpg' and img.mode not in ('RGB', 'L'):
+                # JPEG no admite transparencia: la aplanamos sobre blanco
+                fondo = Image.new('RGB', img.size, (255, 255, 255))
+                rgba = img.convert('RGBA')
+                fondo.paste(rgba, mask=rgba.split()[-1])
+                img = fondo
+            destino = os.path.join(directorio, nombre_variante(nombre, variante, formato))
+            temporal = destino + '.tmp'
+            img.save(temporal, FORMATOS_VARIANTE[formato], quality=CALIDAD)
+            os.replace(temporal, destino)
+
+def resolver_variante(directorio, filename):
+    # Para una petición de variante que no está en disco (imagen subida sin
+    # Pillow, o variantes borradas) intenta generarla; si no se puede,
+    # devuelve el nombre del original.
+    m = PATRON_NOMBRE.match(filename)
+    if not m or not m.group(2):
+        return filename
+    sha = m.group(1)
+    originales = [f for f in os.listdir(directorio) if f.startswith(sha + '.')]
+    if not originales:
+        return filename
+    try:
+        generar_variantes(os.path.join(directorio, originales[0]))
+    except Exception as e:
+        print("❌ Error al generar variantes de imagen:", e)
+    if os.path.exists(os.path.join(directorio, filename)):
+        return filename
+    return originales[0]
+
+def urls_variantes(nombre, slug):
+    # URLs de las variantes de una imagen guardada por hash; None para
+    # imágenes externas o subidas antes de este esquema
+    if not es_nombre_hash(nombre):
+        return None
+    return {
+        f"{variante}_webp" if formato == 'webp' else variante:
+            f"/uploads/{slug}/{nombre_variante(nombre, variante, formato)}"
+        for variante in VARIANTES for formato in FORMATOS_VARIANTE
+    }
@@ -0,0 +1,124 @@
+# ───── IMPORTACIÓN / EXPORTACIÓN DE PRODUCTOS ─────
+# Lectura y escritura en streaming de catálogos en CSV o NDJSON (un objeto
+# JSON por línea). El cuerpo de la petición se copia entero a un temporal
+# (en memoria hasta MAX_EN_MEMORIA, después en disco) antes de tocar la base,
+# y desde ahí se lee fila a fila; la escritura genera el archivo por trozos,
+# así que la memoria no depende del tamaño del catálogo. Las escrituras en la
+# base las hace rutas/productos.py por lotes.
+import io
+import csv
+import json
+import shutil
+import tempfile
+
+FORMATOS = ('csv', 'ndjson')
+TIPOS_CONTENIDO = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/x-jsonlines': 'ndjson',
+}
+MIMETYPES = { 'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson' }
+MAX_EN_MEMORIA = 8 * 1024 * 1024 # el cuerpo copiado pasa a disco a partir de aquí
+
+# Columnas importables y su longitud máxima (las de Producto)
+CAMPOS = {
+    'nombre': 100,
+    'descripcion': None,
+    'precio': 50,
+    'relacionados': None,
+    'imagen': 200,
+}
+# Nombres alternativos aceptados (los que devuelve la IA en la ingesta)
+ALIAS = { 'name': 'nombre', 'description': 'descripcion', 'price': 'precio', 'image': 'imagen' }
+COLUMNAS_EXPORTACION = ['id', 'nombre', 'descripcion', 'precio', 'precio_valor', 'relacionados', 'imagen']
+
+def detectar_formato(tipo_contenido, formato=None):
+    if formato:
+        return formato if formato in FORMATOS else None
+    tipo = (tipo_contenido or '').split(';')[0].strip().lower()
+    return TIPOS_CONTENIDO.get(tipo)
+
+def copiar_cuerpo(flujo):
+    # Lee todo el flujo antes de la primera escritura: la transacción (y el
+    # lock de escritura de SQLite) dura lo que tarda la base, no lo que tarda
+    # un cliente lento en mandar el resto del archivo
+    copia = tempfile.SpooledTemporaryFile(max_size=MAX_EN_MEMORIA)
+    try:
+        shutil.copyfileobj(flujo, copia, 64 * 1024)
+    except BaseException:
+        copia.close()
+        raise
+    copia.seek(0)
+    return copia
+
+def leer_filas(flujo, formato):
+    # Genera (número de fila, dict) desde un flujo binario. Las filas que no
+    # se pueden leer salen como (número, ValueError) para informarlas sin
+    # cortar la importación. La fila 1 es la primera de datos.
+    texto = io.TextIOWrapper(flujo, encoding='utf-8-sig', newline='' if formato == 'csv' else None)
+    if formato == 'csv':
+        lector = csv.DictReader(texto)
+        for numero, fila in enumerate(lector, start=1):
+            if None in fila:
+                yield numero, ValueError("La fila tiene más columnas que la cabecera")
+                continue
+            yield numero, fila
+        return
+    numero = 0
+    for linea in texto:
+        if not linea.strip():
+            continue
+        numero += 1
+        try:
+            fila = json.loads(linea)
+        except ValueError as e:
+            yield numero, ValueError(f"JSON inválido: {e}")
+            continue
+        if not isinstance(fila, dict):
+            yield numero, ValueError("Cada línea debe ser un objeto JSON")
+            continue
+        yield numero, fila
+
+def validar_fila(fila):
+    # Devuelve los campos conocidos presentes en la fila, normalizados a
+    # texto. Lanza ValueError si la fila no es válida. Las columnas
+    # desconocidas (id, precio_valor de una exportación...) se ignoran.
+    producto = {}
+    for clave, valor in fila.items():
+        campo = ALIAS.get(clave, clave) if isinstance(clave, str) else None
+        if campo not in CAMPOS:
+            continue
+        if valor is None:
+            valor = ''
+        elif isinstance(valor, bool) or not isinstance(valor, (str, int, float)):
+            raise ValueError(f"Valor no válido en '{clave}'")
+        valor = str(valor).strip()
+        maximo = CAMPOS[campo]
+        if maximo and len(valor) > maximo:
+            raise ValueError(f"'{campo}' supera los {maximo} caracteres")
+        producto[campo] = valor
+    if not producto.get('nombre'):
+        raise ValueError("Falta el nombre")
+    return producto
+
+def escribir(filas, formato, tamano_trozo=64 * 1024):
+    # Genera el archivo de exportación en trozos de ~tamano_trozo bytes
+    buffer = io.StringIO()
+    if formato == 'csv':
+        escritor = csv.writer(buffer)
+        escritor.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        if formato == 'csv':
+            escritor.writerow(['' if fila.get(c) is None else fila.get(c) for c in COLUMNAS_EXPORTACION])
+        else:
+            buffer.write(json.dumps({c: fila.get(c) for c in COLUMNAS_EXPORTACION}, ensure_ascii=False))
+            buffer.write("\n")
+        if buffer.tell() >= tamano_trozo:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
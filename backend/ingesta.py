@@ -0,0 +1,249 @@
+# ───── INGESTA DE CATÁLOGOS ─────
+# Extracción de texto del PDF y de productos con IA. No toca la base de datos:
+# trabajos.py corre la ingesta en segundo plano (en el ejecutor que arma
+# create_app) y guarda los productos.
+#
+# Flujo: PDF -> texto por página -> chunks acotados en tokens -> una llamada
+# al modelo por chunk (en paralelo, con límite) -> fusión y deduplicado.
+# El texto de las páginas se cachea por SHA-256 del PDF y la respuesta del
+# modelo por SHA-256 de cada chunk, así que volver a subir un catálogo igual
+# (o con pocos cambios) sólo paga por los chunks que cambiaron.
+#
+# openai y PyPDF2 se importan al usarlos: cargarlos cuesta más que el resto de
+# la app junta y sólo los necesita la ingesta, no cada arranque de un worker.
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MODELO_IA = "gpt-3.5-turbo"
+PROMPT_SISTEMA = "Extrae una lista JSON de productos del catálogo con formato [{'name': '...', 'description': '...', 'price': '...'}]"
+
+MAX_TOKENS_CHUNK = 3000
+MAX_CONCURRENCIA = 4
+CHARS_POR_TOKEN = 4 # aproximación suficiente para acotar el tamaño del prompt
+
+def obtener_cliente_ia():
+    # Cliente real de OpenAI; las pruebas pueden sustituirlo por uno local
+    # mediante app.config['INGESTA_CLIENTE_IA']
+    import openai
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return openai.OpenAI()
+
+# --- Caché en disco ---
+
+def sha256_archivo(path, tamano_bloque=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def sha256_texto(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+class CacheIngesta:
+    # Un archivo JSON por clave: <directorio>/<espacio>/<ab>/<clave>.json
+    def __init__(self, directorio):
+        self.directorio = directorio
+
+    def _ruta(self, espacio, clave):
+        return os.path.join(self.directorio, espacio, clave[:2], clave + '.json')
+
+    def obtener(self, espacio, clave):
+        try:
+            with open(self._ruta(espacio, clave), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def guardar(self, espacio, clave, valor):
+        ruta = self._ruta(espacio, clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(valor, f, ensure_ascii=False)
+        os.replace(temporal, ruta) # escritura atómica
+
+# --- PDF ---
+
+def extraer_paginas(pdf_path, progreso=None, cache=None):
+    # Devuelve el texto de cada página; progreso(hechas, total) se llama por página
+    clave = sha256_archivo(pdf_path) if cache else None
+    if cache:
+        paginas = cache.obtener('paginas', clave)
+        if paginas is not None:
+            if progreso:
+                progreso(len(paginas), len(paginas))
+            return paginas
+
+    from PyPDF2 import PdfReader
+    reader = PdfReader(pdf_path)
+    total = len(reader.pages)
+    paginas = []
+    for i, page in enumerate(reader.pages, start=1):
+        paginas.append(page.extract_text() or "")
+        if progreso:
+            progreso(i, total)
+
+    if cache:
+        cache.guardar('paginas', clave, paginas)
+    return paginas
+
+# --- Chunks ---
+
+def estimar_tokens(texto):
+    return (len(texto) + CHARS_POR_TOKEN - 1) // CHARS_POR_TOKEN
+
+def _partir_texto(texto, max_tokens):
+    # Parte una página demasiado larga por líneas (o a lo bruto si una línea
+    # sola ya excede el límite)
+    max_chars = max_tokens * CHARS_POR_TOKEN
+    partes, actual = [], ""
+    for linea in texto.splitlines(keepends=True):
+        while len(linea) > max_chars:
+            if actual:
+                partes.append(actual)
+                actual = ""
+            partes.append(linea[:max_chars])
+            linea = linea[max_chars:]
+        if actual and len(actual) + len(linea) > max_chars:
+            partes.append(actual)
+            actual = ""
+        actual += linea
+    if actual:
+        partes.append(actual)
+    return partes
+
+def dividir_en_chunks(paginas, max_tokens=MAX_TOKENS_CHUNK):
+    # Empaqueta páginas completas de forma voraz hasta max_tokens. Al respetar
+    # los límites de página, editar una página rara vez mueve los cortes de
+    # las demás y sus chunks siguen saliendo de la caché.
+    chunks, actual = [], []
+    tokens_actual = 0
+    for pagina in paginas:
+        pagina = pagina.strip()
+        if not pagina:
+            continue
+        piezas = [pagina] if estimar_tokens(pagina) <= max_tokens else _partir_texto(pagina, max_tokens)
+        for pieza in piezas:
+            tokens = estimar_tokens(pieza)
+            if actual and tokens_actual + tokens > max_tokens:
+                chunks.append("\n".join(actual))
+                actual, tokens_actual = [], 0
+            actual.append(pieza)
+            tokens_actual += tokens
+    if actual:
+        chunks.append("\n".join(actual))
+    return chunks
+
+# --- Modelo ---
+
+def _parsear_respuesta(content):
+    # El modelo a veces envuelve el JSON en ```json ... ``` o añade texto
+    texto = content.strip()
+    if texto.startswith("```"):
+        texto = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", texto)
+    try:
+        datos = json.loads(texto)
+    except ValueError:
+        inicio, fin = texto.find('['), texto.rfind(']')
+        if inicio == -1 or fin <= inicio:
+            raise
+        datos = json.loads(texto[inicio:fin + 1])
+    if isinstance(datos, dict):
+        datos = datos.get('products') or datos.get('productos') or []
+    return [p for p in datos if isinstance(p, dict)]
+
+def extraer_productos_chunk(texto, cliente):
+    chat = cliente.chat.completions.create(
+        model=MODELO_IA,
+        messages=[
+            {"role": "system", "content": PROMPT_SISTEMA},
+            {"role": "user", "content": texto}
+        ]
+    )
+    return _parsear_respuesta(chat.choices[0].message.content)
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+def fusionar_productos(listas):
+    # Une los resultados parciales manteniendo el orden del catálogo. Un mismo
+    # producto puede aparecer en dos chunks (p. ej. cortado entre páginas, a
+    # veces sin precio en uno de ellos): nos quedamos con la versión más
+    # completa. Mismo nombre con precios distintos son variantes distintas.
+    fusionados = []
+    por_nombre = {}
+    for productos in listas:
+        for prod in productos:
+            nombre = _normalizar(prod.get("name"))
+            if not nombre:
+                continue
+            precio = _normalizar(prod.get("price"))
+            previo = None
+            for candidato in por_nombre.setdefault(nombre, []):
+                precio_candidato = _normalizar(candidato.get("price"))
+                if not precio or not precio_candidato or precio == precio_candidato:
+                    previo = candidato
+                    break
+            if previo is None:
+                nuevo = dict(prod)
+                por_nombre[nombre].append(nuevo)
+                fusionados.append(nuevo)
+                continue
+            for campo, valor in prod.items():
+                if campo != "name" and valor and len(str(valor)) > len(str(previo.get(campo) or '')):
+                    previo[campo] = valor
+    return fusionados
+
+def extraer_productos(paginas, cliente, cache=None, max_tokens=MAX_TOKENS_CHUNK,
+                      max_concurrencia=MAX_CONCURRENCIA, progreso=None):
+    # Devuelve (productos, errores). Un chunk fallido no tumba la ingesta:
+    # su error se informa y el resto de productos se guarda. Sólo si fallan
+    # todos se relanza la excepción.
+    chunks = dividir_en_chunks(paginas, max_tokens)
+    claves = [sha256_texto(MODELO_IA, PROMPT_SISTEMA, chunk) for chunk in chunks]
+    resultados = [None] * len(chunks)
+    errores = []
+    hechos = 0
+
+    pendientes = []
+    for i, clave in enumerate(claves):
+        guardado = cache.obtener('chunks', clave) if cache else None
+        if guardado is not None:
+            resultados[i] = guardado
+            hechos += 1
+        else:
+            pendientes.append(i)
+    if progreso:
+        progreso(hechos, len(chunks))
+
+    ultimo_error = None
+    if pendientes:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrencia, len(pendientes)))) as pool:
+            futuros = {pool.submit(extraer_productos_chunk, chunks[i], cliente): i for i in pendientes}
+            for futuro in as_completed(futuros):
+                i = futuros[futuro]
+                try:
+                    resultados[i] = futuro.result()
+                    if cache:
+                        cache.guardar('chunks', claves[i], resultados[i])
+                except Exception as e:
+                    ultimo_error = e
+                    errores.append(f"chunk {i + 1}/{len(chunks)}: {e}")
+                hechos += 1
+                if progreso:
+                    progreso(hechos, len(chunks))
+
+    if chunks and len(errores) == len(chunks):
+        raise ultimo_error
+    return fusionar_productos(r for r in resultados if r), errores
@@ -0,0 +1,140 @@
+# ───── BUFFER DE LEADS ─────
+# Escritura diferida: los leads se acumulan en memoria y un hilo los guarda en
+# lotes (un solo commit por lote). Así una ráfaga de clics no serializa un
+# commit por petición sobre SQLite. Quien crea el buffer decide cómo se guarda
+# un lote mediante la función guardar(lote).
+#
+# Fallos: sólo se reintentan los errores que reintentable(error) da por
+# transitorios (un lock de la base), como mucho max_reintentos veces por lote.
+# Cualquier otro error (una fila inválida, una restricción) no se reintenta:
+# el lote se guarda lead a lead para aislar los malos, que se descartan
+# (se informan y se pasan a al_descartar). Así un lead malo no frena a los
+# que vienen detrás.
+#
+# Hilo: con automatico=True lo arranca el primer agregar() de cada proceso.
+# Un hilo creado antes de un fork (gunicorn --preload importa la app en el
+# maestro) no existe en los workers, así que se compara el pid.
+import os
+import threading
+import time
+
+class BufferLeads:
+    def __init__(self, guardar, intervalo=0.2, max_lote=500, max_pendientes=10000,
+                 reintentable=lambda error: False, max_reintentos=5, espera_max=0.5, al_descartar=None,
+                 automatico=False):
+        self.guardar = guardar
+        self.intervalo = intervalo
+        self.max_lote = max_lote
+        self.max_pendientes = max_pendientes
+        self.reintentable = reintentable
+        self.max_reintentos = max_reintentos
+        self.espera_max = espera_max
+        self.al_descartar = al_descartar
+        self.automatico = automatico
+        self._pendientes = []
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._pid = None # proceso en el que corre self._hilo
+        self._detenido = False
+        self._fallos = 0 # intentos fallidos seguidos del lote en la cabeza de la cola
+
+    def iniciar(self):
+        with self._cond:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._detenido = False
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name='buffer-leads', daemon=True)
+            self._hilo.start()
+
+    def agregar(self, lead):
+        # Devuelve False si el buffer sigue lleno tras espera_max segundos: la
+        # petición no espera más que eso aunque la base no dé abasto
+        if self.automatico and self._pid != os.getpid():
+            self.iniciar()
+        limite = time.monotonic() + self.espera_max
+        with self._cond:
+            while len(self._pendientes) >= self.max_pendientes and not self._detenido:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._cond.wait(min(restante, self.intervalo))
+            self._pendientes.append(lead)
+            if len(self._pendientes) >= self.max_lote:
+                self._cond.notify_all()
+            return True
+
+    def vaciar(self):
+        # Guarda todo lo pendiente desde el hilo que llama; devuelve cuántos
+        # leads salieron de la cola (guardados o descartados)
+        total = 0
+        while True:
+            with self._cond:
+                lote = self._pendientes[:self.max_lote]
+                del self._pendientes[:len(lote)]
+            if not lote:
+                return total
+            if self._guardar_lote(lote):
+                total += len(lote)
+            else:
+                time.sleep(self.intervalo)
+
+    def detener(self):
+        with self._cond:
+            self._detenido = True
+            self._cond.notify_all()
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            hilo.join()
+        self.vaciar()
+
+    def pendientes(self):
+        with self._cond:
+            return len(self._pendientes)
+
+    def _guardar_lote(self, lote):
+        # Devuelve False si el lote volvió a la cola para reintentarlo
+        try:
+            self.guardar(lote)
+            self._fallos = 0
+            return True
+        except Exception as e:
+            if self.reintentable(e) and self._fallos + 1 < self.max_reintentos:
+                self._fallos += 1
+                print(f"❌ Error transitorio al guardar lote de leads (intento {self._fallos}):", e)
+                with self._cond:
+                    self._pendientes[:0] = lote
+                return False
+            self._fallos = 0
+            if len(lote) > 1 and not self.reintentable(e):
+                self._guardar_de_a_uno(lote)
+            else:
+                self._descartar(lote, e)
+            return True
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def _guardar_de_a_uno(self, lote):
+        for lead in lote:
+            try:
+                self.guardar([lead])
+            except Exception as e:
+                self._descartar([lead], e)
+
+    def _descartar(self, lote, error):
+        print(f"❌ Se descartan {len(lote)} leads que no se pudieron guardar:", error)
+        if self.al_descartar:
+            self.al_descartar(lote, error)
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                if not self._detenido and len(self._pendientes) < self.max_lote:
+                    self._cond.wait(self.intervalo)
+                if self._detenido:
+                    return
+                lote = self._pendientes[:self.max_lote]
+                del self._pendientes[:len(lote)]
+            if lote and not self._guardar_lote(lote):
+                time.sleep(self.intervalo)
@@ -0,0 +1,223 @@
+# ───── MÉTRICAS ─────
+# Instrumentación en memoria del proceso, exportada en formato de texto de
+# Prometheus (/metrics). Cada worker tiene sus propios contadores: Prometheus
+# los agrega al raspar cada instancia.
+#
+# Por petición se cuentan las consultas SQL y su tiempo (listeners del engine,
+# estado por hilo). Las consultas lentas se registran en el log y, si una
+# misma sentencia se repite más de umbral_n_mas_1 veces en una petición, se
+# avisa de un posible N+1 (un SELECT por fila en lugar de uno por lote).
+import time
+import logging
+import threading
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+# Segundos; los de Prometheus por defecto
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+BUCKETS_FASES = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pares.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._valores = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] += cantidad
+
+    def muestras(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._series = {} # etiquetas -> [conteos por bucket, suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def muestras(self):
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        nombres = self.etiquetas + ('le',)
+        for clave, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                yield f"{self.nombre}_bucket{_etiquetas(nombres, clave + (_numero(limite),))} {acumulado}"
+            yield f"{self.nombre}_bucket{_etiquetas(nombres, clave + ('+Inf',))} {total}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}"
+
+class Indicador:
+    # Valor leído en el momento de exportar (tamaño de colas, cachés...)
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, leer):
+        self.nombre, self.ayuda, self.leer = nombre, ayuda, leer
+
+    def muestras(self):
+        yield f"{self.nombre} {_numero(self.leer())}"
+
+class Metricas:
+    def __init__(self, sql_lenta_ms=200, umbral_n_mas_1=10, prefijo='paratodos'):
+        self.sql_lenta = sql_lenta_ms / 1000
+        self.umbral_n_mas_1 = umbral_n_mas_1
+        self._metricas = []
+        self._local = threading.local()
+
+        p = prefijo
+        self.peticiones = self.registrar(Histograma(
+            f'{p}_http_peticion_segundos', "Latencia de las peticiones HTTP", ('ruta', 'metodo', 'estado')
+        ))
+        self.consultas_peticion = self.registrar(Histograma(
+            f'{p}_http_consultas_sql', "Consultas SQL por petición", ('ruta',), BUCKETS_CONSULTAS
+        ))
+        self.sql_peticion = self.registrar(Histograma(
+            f'{p}_http_sql_segundos', "Tiempo en SQL por petición", ('ruta',)
+        ))
+        self.consultas = self.registrar(Contador(
+            f'{p}_sql_consultas_total', "Consultas SQL ejecutadas (dentro y fuera de peticiones)"
+        ))
+        self.sql_segundos = self.registrar(Contador(
+            f'{p}_sql_segundos_total', "Tiempo total en consultas SQL"
+        ))
+        self.consultas_lentas = self.registrar(Contador(
+            f'{p}_sql_lentas_total', "Consultas SQL por encima del umbral de consulta lenta", ('ruta',)
+        ))
+        self.n_mas_1 = self.registrar(Contador(
+            f'{p}_sql_n_mas_1_total', "Peticiones que repitieron una misma sentencia SQL más del umbral", ('ruta',)
+        ))
+        self.fases = self.registrar(Histograma(
+            f'{p}_ingesta_fase_segundos', "Duración de las fases de ingesta de catálogos", ('fase',), BUCKETS_FASES
+        ))
+        self.ingestas = self.registrar(Contador(
+            f'{p}_ingesta_trabajos_total', "Trabajos de ingesta terminados", ('estado',)
+        ))
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    # ── Peticiones ──
+
+    def iniciar_peticion(self, ruta):
+        self._local.peticion = {
+            "ruta": ruta, "inicio": time.perf_counter(), "consultas": 0, "sql": 0.0,
+            "sentencias": Counter(), "por_lotes": False
+        }
+
+    def recorrido_por_lotes(self):
+        # La petición recorre una tabla por lotes (keyset): repetir la misma
+        # sentencia es lo esperado y no cuenta para el detector de N+1
+        peticion = getattr(self._local, 'peticion', None)
+        if peticion is not None:
+            peticion["por_lotes"] = True
+
+    def terminar_peticion(self, metodo, estado):
+        estado_peticion = getattr(self._local, 'peticion', None)
+        if estado_peticion is None:
+            return
+        self._local.peticion = None
+        ruta = estado_peticion["ruta"]
+        self.peticiones.observar(time.perf_counter() - estado_peticion["inicio"], ruta, metodo, estado)
+        self.consultas_peticion.observar(estado_peticion["consultas"], ruta)
+        self.sql_peticion.observar(estado_peticion["sql"], ruta)
+        if estado_peticion["sentencias"] and not estado_peticion["por_lotes"]:
+            sentencia, veces = estado_peticion["sentencias"].most_common(1)[0]
+            if veces > self.umbral_n_mas_1:
+                self.n_mas_1.inc(ruta)
+                log.warning("Posible N+1 en %s %s: %d ejecuciones de %s", metodo, ruta, veces, _resumir(sentencia))
+
+    # ── SQL ──
+
+    def instalar_sql(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _antes(conn, cursor, sentencia, parametros, contexto, executemany):
+            conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _despues(conn, cursor, sentencia, parametros, contexto, executemany):
+            inicios = conn.info.get('metricas_inicio')
+            if inicios:
+                self.registrar_consulta(sentencia, time.perf_counter() - inicios.pop())
+
+    def registrar_consulta(self, sentencia, segundos):
+        self.consultas.inc()
+        self.sql_segundos.inc(cantidad=segundos)
+        peticion = getattr(self._local, 'peticion', None)
+        ruta = peticion["ruta"] if peticion else ""
+        if peticion is not None:
+            peticion["consultas"] += 1
+            peticion["sql"] += segundos
+            peticion["sentencias"][sentencia] += 1
+        if segundos >= self.sql_lenta:
+            self.consultas_lentas.inc(ruta)
+            log.warning("Consulta lenta (%.0f ms) en %s: %s", segundos * 1000, ruta or "segundo plano", _resumir(sentencia))
+
+    # ── Ingesta ──
+
+    def cronometrar(self, fase):
+        return _Cronometro(self.fases, fase)
+
+    # ── Exportación ──
+
+    def exportar(self):
+        lineas = []
+        for metrica in self._metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.muestras())
+        return "\n".join(lineas) + "\n"
+
+class _Cronometro:
+    def __init__(self, histograma, fase):
+        self.histograma, self.fase = histograma, fase
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self.inicio, self.fase)
+        return False
+
+def _resumir(sentencia, largo=300):
+    sentencia = " ".join(sentencia.split())
+    return sentencia if len(sentencia) <= largo else sentencia[:largo] + "..."
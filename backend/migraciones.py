@@ -0,0 +1,104 @@
+# ───── MIGRACIONES ─────
+# db.create_all() crea las tablas que faltan pero no modifica las existentes.
+# Estas migraciones llevan una base ya creada (p. ej. instance/paratodos.db)
+# al esquema actual. La versión aplicada se guarda en schema_version y cada
+# paso es idempotente, así que una base nueva creada con create_all() las
+# atraviesa sin cambios.
+from sqlalchemy import inspect, text
+from precios import parsear_precio
+
+TAMANO_LOTE = 1000
+
+def _columnas(conn, tabla):
+    return {c['name'] for c in inspect(conn).get_columns(tabla)}
+
+def _tablas(conn):
+    return set(inspect(conn).get_table_names())
+
+def _agregar_columna(conn, tabla, columna, tipo):
+    if tabla in _tablas(conn) and columna not in _columnas(conn, tabla):
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}"))
+
+def m001_columnas_faltantes(conn):
+    # Columnas añadidas a los modelos después de crear las primeras bases
+    _agregar_columna(conn, 'producto', 'imagen', 'VARCHAR(200)')
+    _agregar_columna(conn, 'lead', 'producto_id', 'INTEGER REFERENCES producto (id)')
+    _agregar_columna(conn, 'lead', 'estado', "VARCHAR(50) DEFAULT 'pendiente'")
+    _agregar_columna(conn, 'trabajo_ingesta', 'chunks_total', 'INTEGER DEFAULT 0')
+    _agregar_columna(conn, 'trabajo_ingesta', 'chunks_procesados', 'INTEGER DEFAULT 0')
+
+def m002_precio_numerico(conn):
+    # Precio numérico junto al texto original, calculado con parsear_precio
+    _agregar_columna(conn, 'producto', 'precio_valor', 'NUMERIC(12, 2)')
+    ultimo_id = 0
+    while True:
+        filas = conn.execute(text(
+            "SELECT id, precio FROM producto "
+            "WHERE id > :ultimo AND precio_valor IS NULL AND precio IS NOT NULL "
+            "ORDER BY id LIMIT :limite"
+        ), {"ultimo": ultimo_id, "limite": TAMANO_LOTE}).all()
+        if not filas:
+            break
+        valores = [
+            {"id": producto_id, "valor": parsear_precio(precio)}
+            for producto_id, precio in filas
+        ]
+        valores = [v for v in valores if v["valor"] is not None]
+        if valores:
+            conn.execute(text("UPDATE producto SET precio_valor = :valor WHERE id = :id"), valores)
+        ultimo_id = filas[-1][0]
+
+# Índices para las consultas de rutas/ (deben coincidir con __table_args__)
+INDICES = [
+    ('ix_producto_tienda_id', 'producto', 'tienda_id, id'),
+    ('ix_producto_precio', 'producto', 'precio_valor, id'),
+    ('ix_lead_tienda_fecha', 'lead', 'tienda_id, fecha'),
+    ('ix_lead_producto_id', 'lead', 'producto_id'),
+    ('ix_trabajo_ingesta_tienda', 'trabajo_ingesta', 'tienda_id, id'),
+    ('ix_trabajo_ingesta_estado', 'trabajo_ingesta', 'estado'),
+]
+
+def m003_indices(conn):
+    tablas = _tablas(conn)
+    for nombre, tabla, columnas in INDICES:
+        if tabla in tablas:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})"))
+
+def m004_indice_nombre(conn):
+    # Búsqueda por nombre dentro de la tienda (importación con upsert)
+    if 'producto' in _tablas(conn):
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_producto_tienda_nombre ON producto (tienda_id, nombre)"))
+
+def m005_sin_indice_tienda_precio(conn):
+    # Ninguna consulta filtra por precio dentro de una tienda: el índice sólo
+    # encarecía cada escritura de productos
+    conn.execute(text("DROP INDEX IF EXISTS ix_producto_tienda_precio"))
+
+MIGRACIONES = [
+    (1, m001_columnas_faltantes),
+    (2, m002_precio_numerico),
+    (3, m003_indices),
+    (4, m004_indice_nombre),
+    (5, m005_sin_indice_tienda_precio),
+]
+
+def version_actual(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    return conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_version")).scalar()
+
+def migrar(engine):
+    # Aplica las migraciones pendientes; devuelve las versiones aplicadas
+    aplicadas = []
+    with engine.begin() as conn:
+        actual = version_actual(conn)
+        for version, migracion in MIGRACIONES:
+            if version <= actual:
+                continue
+            migracion(conn)
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+            aplicadas.append(version)
+    if aplicadas:
+        # Con índices nuevos conviene refrescar las estadísticas del planificador
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return aplicadas
@@ -0,0 +1,154 @@
+# ───── MODELOS ─────
+# Tablas de la app y utilidades de la sesión. db se enlaza a la app en
+# create_app() (db.init_app); el esquema no se crea al arrancar sino con
+# `flask crear-esquema` (ver preparar_esquema).
+import datetime
+from flask import current_app
+from flask_sqlalchemy import SQLAlchemy
+import migraciones
+import busqueda
+import recomendaciones
+import basedatos
+from precios import parsear_precio
+
+db = SQLAlchemy()
+
+def transaccion(fn):
+    # Ejecuta fn (que termina en commit) reintentando bloqueos transitorios
+    return basedatos.con_reintentos(db.session, fn, intentos=current_app.config['DB_REINTENTOS'])
+
+class Tienda(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    responsable = db.Column(db.String(100))
+    rif = db.Column(db.String(20))
+    email = db.Column(db.String(100))
+    telefono = db.Column(db.String(30))
+    instagram = db.Column(db.String(100))
+    direccion = db.Column(db.Text)
+    productos = db.Column(db.Text) # Considerar normalizar esto si es una lista compleja
+    color = db.Column(db.String(10))
+    logo = db.Column(db.String(200))
+    catalogo = db.Column(db.String(200))
+    slug = db.Column(db.String(100), unique=True)
+
+class Producto(db.Model):
+    __table_args__ = (
+        db.Index('ix_producto_tienda_id', 'tienda_id', 'id'),
+        db.Index('ix_producto_precio', 'precio_valor', 'id'),
+        db.Index('ix_producto_tienda_nombre', 'tienda_id', 'nombre'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100))
+    descripcion = db.Column(db.Text)
+    precio = db.Column(db.String(50)) # Texto tal cual lo escribe la tienda o la IA
+    precio_valor = db.Column(db.Numeric(12, 2, asdecimal=False)) # Importe numérico derivado de precio
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tienda.id'))
+    relacionados = db.Column(db.Text)
+    imagen = db.Column(db.String(200))
+
+    @db.validates('precio')
+    def _sincronizar_precio_valor(self, key, precio):
+        self.precio_valor = parsear_precio(precio)
+        return precio
+
+class Lead(db.Model):
+    __table_args__ = (
+        db.Index('ix_lead_tienda_fecha', 'tienda_id', 'fecha'),
+        db.Index('ix_lead_producto_id', 'producto_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # cliente = db.Column(db.String(100))
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False)
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tienda.id'), nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    estado = db.Column(db.String(50), default="pendiente")
+    # producto = db.relationship('Producto') # Opcional para acceso fácil
+    # tienda = db.relationship('Tienda') # Opcional para acceso fácil
+
+class LeadDiario(db.Model):
+    # Leads acumulados por tienda, día y producto; se actualiza junto a cada
+    # lote de leads para no tener que contar la tabla Lead en los dashboards
+    __tablename__ = 'lead_diario'
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tienda.id'), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductoRelacionado(db.Model):
+    # Vecinos por similitud de texto, precalculados (ver recomendaciones.py)
+    __tablename__ = 'producto_relacionado'
+    __table_args__ = (
+        db.Index('ix_producto_relacionado_relacionado', 'relacionado_id'),
+    )
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), primary_key=True)
+    relacionado_id = db.Column(db.Integer, db.ForeignKey('producto.id'), primary_key=True)
+    puntaje = db.Column(db.Float, nullable=False)
+
+class TrabajoIngesta(db.Model):
+    # Cola de ingesta de catálogos: la tabla sobrevive a reinicios del servidor
+    __tablename__ = 'trabajo_ingesta'
+    __table_args__ = (
+        db.Index('ix_trabajo_ingesta_tienda', 'tienda_id', 'id'),
+        db.Index('ix_trabajo_ingesta_estado', 'estado'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    tienda_id = db.Column(db.Integer, db.ForeignKey('tienda.id'), nullable=False)
+    archivo = db.Column(db.String(200), nullable=False)
+    estado = db.Column(db.String(20), default="pendiente") # pendiente | procesando | completado | error
+    fase = db.Column(db.String(20)) # pdf | ia | guardando
+    paginas_total = db.Column(db.Integer, default=0)
+    paginas_procesadas = db.Column(db.Integer, default=0)
+    chunks_total = db.Column(db.Integer, default=0)
+    chunks_procesados = db.Column(db.Integer, default=0)
+    productos_creados = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    creado = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    actualizado = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+class Subida(db.Model):
+    # Subidas por trozos en curso (ver subidas.py). El id es aleatorio y hace
+    # de credencial: quien lo conoce puede enviar trozos y usar el archivo.
+    __tablename__ = 'subida'
+    __table_args__ = (
+        db.Index('ix_subida_actualizado', 'actualizado'),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False) # catalogo | imagen
+    nombre = db.Column(db.String(200), nullable=False)
+    tamano = db.Column(db.BigInteger, nullable=False)
+    recibidos = db.Column(db.BigInteger, default=0, nullable=False)
+    estado = db.Column(db.String(20), default="subiendo") # subiendo | completa | usada
+    sha256 = db.Column(db.String(64))
+    creado = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    actualizado = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+def reconstruir_rollup_leads_db():
+    db.session.execute(db.delete(LeadDiario))
+    dia = db.func.date(Lead.fecha)
+    db.session.execute(
+        db.insert(LeadDiario).from_select(
+            ['tienda_id', 'dia', 'producto_id', 'total'],
+            db.select(Lead.tienda_id, dia, Lead.producto_id, db.func.count())
+            .where(Lead.producto_id.isnot(None))
+            .group_by(Lead.tienda_id, dia, Lead.producto_id)
+        )
+    )
+
+
+def preparar_esquema():
+    # Crea las tablas e índices que falten, aplica las migraciones y prepara
+    # los índices de búsqueda. Idempotente; con el contexto de la app.
+    db.create_all()
+    # Lleva bases creadas con versiones anteriores al esquema actual
+    aplicadas = migraciones.migrar(db.engine)
+    # Índice FTS5 de productos; si es nuevo se puebla con lo que ya exista
+    if busqueda.crear_indice(db.session):
+        busqueda.reconstruir_indice(db.session)
+    recomendaciones.crear_vocabulario(db.session)
+    db.session.commit()
+    # Rollup de leads vacío en una base con leads previos: lo poblamos
+    if db.session.query(LeadDiario.tienda_id).first() is None and db.session.query(Lead.id).first() is not None:
+        reconstruir_rollup_leads_db()
+        db.session.commit()
+    return aplicadas
@@ -0,0 +1,50 @@
+# ───── PRECIOS ─────
+# Producto.precio es texto libre (lo escribe el comerciante o lo extrae la IA
+# del catálogo): "$10", "Bs. 1.234,56", "1,234.56 USD", "10$ c/u", "Consultar"...
+# parsear_precio obtiene el primer importe como número para filtrar y ordenar.
+import re
+from decimal import Decimal, InvalidOperation
+
+PATRON_IMPORTE = re.compile(r"\d[\d.,]*")
+# Un importe pegado a una moneda tiene prioridad: "Modelo X200 - $15" -> 15
+MONEDAS = r"(?:US\$|\$|USD|Bs\.?S?|VES|€|EUR|REF)"
+PATRON_CON_MONEDA = re.compile(
+    rf"{MONEDAS}\s*(\d[\d.,]*)|(\d[\d.,]*)\s*{MONEDAS}", re.IGNORECASE
+)
+
+def _normalizar_importe(importe):
+    importe = importe.rstrip('.,')
+    puntos, comas = importe.count('.'), importe.count(',')
+    if puntos and comas:
+        # El último separador que aparece es el decimal
+        decimal = '.' if importe.rfind('.') > importe.rfind(',') else ','
+        miles = ',' if decimal == '.' else '.'
+        return importe.replace(miles, '').replace(decimal, '.')
+    separador = '.' if puntos else ',' if comas else None
+    if separador is None:
+        return importe
+    if importe.count(separador) > 1:
+        return importe.replace(separador, '')
+    entero, fraccion = importe.split(separador)
+    # "1.500" o "12,000": separador de miles; "0.500", "12.5" o "1,50": decimal
+    if len(fraccion) == 3 and entero.strip('0'):
+        return entero + fraccion
+    return entero + '.' + fraccion
+
+def parsear_precio(texto):
+    if texto is None:
+        return None
+    texto = str(texto)
+    m = PATRON_CON_MONEDA.search(texto)
+    if m:
+        importe = m.group(1) or m.group(2)
+    else:
+        m = PATRON_IMPORTE.search(texto)
+        if not m:
+            return None
+        importe = m.group(0)
+    try:
+        valor = Decimal(_normalizar_importe(importe))
+    except InvalidOperation:
+        return None
+    return float(valor.quantize(Decimal('0.01')))
@@ -0,0 +1,284 @@
+# ───── PRODUCTOS RELACIONADOS ─────
+# Índice precalculado de vecinos por similitud de texto: cada producto se
+# representa como un vector TF-IDF de nombre y descripción (el nombre pesa
+# más) y se guardan sus k vecinos más cercanos por coseno en
+# producto_relacionado. Servirlos es leer k filas por la clave primaria.
+#
+# Comparar contra todo el catálogo no escala, así que los candidatos salen del
+# índice FTS5 de búsqueda: para los términos de más peso del producto se leen
+# como mucho MAX_POR_TERMINO filas de su lista de apariciones (las más
+# cercanas a su rowid, a ambos lados), se ordenan por el peso de los términos
+# compartidos y sólo los mejores se comparan por coseno. Las frecuencias de
+# documento salen de fts5vocab. Sólo con SQLite: con otra base el índice no se
+# mantiene y la lista de relacionados queda vacía.
+#
+# Al crear o editar productos se recalculan sus vecinos y se les ofrece a
+# ellos como vecino (si mejora su k-ésimo). Las frecuencias de documento
+# cambian poco a poco; `flask reconstruir-relacionados` lo recalcula todo.
+import re
+import math
+import unicodedata
+from collections import Counter
+from sqlalchemy import text
+import busqueda
+
+TABLA = "producto_relacionado"
+TABLA_VOCAB = "producto_fts_vocab"
+K = 10                    # vecinos guardados por producto
+MAX_TERMINOS_CONSULTA = 8 # términos del producto con los que se buscan candidatos
+MAX_POR_TERMINO = 200     # filas leídas del índice por término (acota los términos comunes)
+MAX_CANDIDATOS = 100      # candidatos que se comparan por coseno
+PESO_NOMBRE = 3           # una aparición en el nombre cuenta como tres en la descripción
+TAMANO_LOTE = 500
+
+PALABRAS_VACIAS = set("""
+    a al algo ante con contra cual de del desde donde el en entre es esta este esto
+    hasta la las le lo los mas mi muy no o para pero por que se sin sobre su sus
+    tambien tu un una uno unos y ya the and for with of x
+""".split())
+
+def soportado(session):
+    return busqueda.soportado(session) and busqueda.existe_indice(session)
+
+def crear_vocabulario(session):
+    # Vista de términos del índice FTS5 (un registro por término y columna)
+    if not soportado(session):
+        return
+    session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_VOCAB} USING fts5vocab({busqueda.TABLA_FTS}, 'col')"
+    ))
+
+# ───── VECTORES ─────
+
+def tokenizar(texto):
+    # Igual que el tokenizador del índice (unicode61 remove_diacritics):
+    # minúsculas, sin tildes, separando por todo lo que no sea letra o dígito
+    texto = unicodedata.normalize('NFKD', (texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r"[^\W_]+", texto) if len(t) > 1 and t not in PALABRAS_VACIAS]
+
+def frecuencias(nombre, descripcion):
+    tf = Counter()
+    for t in tokenizar(nombre):
+        tf[t] += PESO_NOMBRE
+    for t in tokenizar(descripcion):
+        tf[t] += 1
+    return tf
+
+class Vocabulario:
+    # Frecuencias de documento (nombre + descripción) leídas de fts5vocab a
+    # demanda y guardadas para el resto del cálculo
+    def __init__(self, session, completo=False):
+        self.session = session
+        self.documentos = session.execute(text(f"SELECT count(*) FROM {busqueda.TABLA_FTS}")).scalar() or 0
+        self.df = {}
+        if completo:
+            filas = session.execute(text(
+                f"SELECT term, sum(doc) FROM {TABLA_VOCAB} WHERE col IN ('nombre', 'descripcion') GROUP BY term"
+            ))
+            self.df.update(filas.all())
+
+    def cargar(self, terminos):
+        faltan = [t for t in set(terminos) if t not in self.df]
+        for i in range(0, len(faltan), TAMANO_LOTE):
+            lote = faltan[i:i + TAMANO_LOTE]
+            marcadores = ", ".join(f":t{n}" for n in range(len(lote)))
+            filas = self.session.execute(text(
+                f"SELECT term, sum(doc) FROM {TABLA_VOCAB} "
+                f"WHERE col IN ('nombre', 'descripcion') AND term IN ({marcadores}) GROUP BY term"
+            ), {f"t{n}": t for n, t in enumerate(lote)})
+            self.df.update(filas.all())
+            for t in lote:
+                self.df.setdefault(t, 0)
+
+    def idf(self, termino):
+        return math.log((1 + self.documentos) / (1 + self.df.get(termino, 0))) + 1
+
+def vector(tf, vocab):
+    pesos = {t: (1 + math.log(n)) * vocab.idf(t) for t, n in tf.items()}
+    norma = math.sqrt(sum(p * p for p in pesos.values()))
+    return {t: p / norma for t, p in pesos.items()} if norma else {}
+
+def coseno(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(p * b.get(t, 0.0) for t, p in a.items())
+
+# ───── CÁLCULO DE VECINOS ─────
+
+def _candidatos(session, producto_id, vec):
+    # Un OR de todos los términos ordenado por bm25 puntúa cada fila que tenga
+    # alguno; con términos comunes eso es medio catálogo. Leyendo un tramo
+    # acotado por término el coste no depende del tamaño del catálogo. El
+    # tramo se centra en el rowid del producto (mitad antes, mitad después)
+    # para no sesgar todos los candidatos hacia los productos más nuevos. La
+    # suma de pesos se hace en SQLite para no traer miles de filas.
+    terminos = sorted(vec, key=vec.get, reverse=True)[:MAX_TERMINOS_CONSULTA]
+    if not terminos:
+        return []
+    tramos, params = [], {"id": producto_id, "por_lado": MAX_POR_TERMINO // 2, "limite": MAX_CANDIDATOS}
+    for n, termino in enumerate(terminos):
+        for condicion, sentido in (("<", "DESC"), (">", "ASC")):
+            tramos.append(f"""
+                SELECT * FROM (
+                    SELECT rowid AS id, :w{n} AS peso FROM {busqueda.TABLA_FTS}
+                    WHERE {busqueda.TABLA_FTS} MATCH :t{n} AND rowid {condicion} :id
+                    ORDER BY rowid {sentido} LIMIT :por_lado
+                )""")
+        params[f"t{n}"] = f'{{nombre descripcion}} : "{termino}"'
+        params[f"w{n}"] = vec[termino]
+    sql = f"""
+        SELECT id FROM ({" UNION ALL ".join(tramos)})
+        GROUP BY id ORDER BY sum(peso) DESC, id LIMIT :limite
+    """
+    return session.execute(text(sql), params).scalars().all()
+
+def _textos(session, ids):
+    textos = {}
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        marcadores = ", ".join(f":id{n}" for n in range(len(lote)))
+        filas = session.execute(
+            text(f"SELECT id, nombre, descripcion FROM producto WHERE id IN ({marcadores})"),
+            {f"id{n}": producto_id for n, producto_id in enumerate(lote)}
+        )
+        for producto_id, nombre, descripcion in filas:
+            textos[producto_id] = frecuencias(nombre, descripcion)
+    return textos
+
+def calcular_vecinos(session, ids, vocab=None, k=K):
+    # {producto_id: [(vecino_id, puntaje), ...]} con los k mejores de cada uno
+    vocab = vocab or Vocabulario(session)
+    tf = _textos(session, ids)
+    vocab.cargar(t for f in tf.values() for t in f)
+    vectores = {producto_id: vector(f, vocab) for producto_id, f in tf.items()}
+
+    candidatos = {producto_id: _candidatos(session, producto_id, v) for producto_id, v in vectores.items()}
+    faltan = {c for cs in candidatos.values() for c in cs if c not in tf}
+    tf_candidatos = _textos(session, faltan)
+    vocab.cargar(t for f in tf_candidatos.values() for t in f)
+    vectores.update((c, vector(f, vocab)) for c, f in tf_candidatos.items())
+
+    vecinos = {}
+    for producto_id, cs in candidatos.items():
+        puntajes = [(c, coseno(vectores[producto_id], vectores[c])) for c in cs if c in vectores]
+        puntajes = [(c, p) for c, p in puntajes if p > 0]
+        puntajes.sort(key=lambda x: (-x[1], x[0]))
+        vecinos[producto_id] = puntajes[:k]
+    return vecinos
+
+# ───── ÍNDICE ─────
+
+def _reemplazar_listas(session, listas):
+    # listas: {producto_id: [(vecino_id, puntaje), ...]}
+    ids = list(listas)
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        marcadores = ", ".join(f":id{n}" for n in range(len(lote)))
+        session.execute(
+            text(f"DELETE FROM {TABLA} WHERE producto_id IN ({marcadores})"),
+            {f"id{n}": producto_id for n, producto_id in enumerate(lote)}
+        )
+    filas = [
+        {"producto_id": producto_id, "relacionado_id": vecino, "puntaje": round(puntaje, 6)}
+        for producto_id, vecinos in listas.items() for vecino, puntaje in vecinos
+    ]
+    if filas:
+        session.execute(
+            text(f"INSERT INTO {TABLA} (producto_id, relacionado_id, puntaje) VALUES (:producto_id, :relacionado_id, :puntaje)"),
+            filas
+        )
+
+def _listas_actuales(session, ids):
+    listas = {producto_id: [] for producto_id in ids}
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        marcadores = ", ".join(f":id{n}" for n in range(len(lote)))
+        filas = session.execute(
+            text(f"SELECT producto_id, relacionado_id, puntaje FROM {TABLA} WHERE producto_id IN ({marcadores})"),
+            {f"id{n}": producto_id for n, producto_id in enumerate(lote)}
+        )
+        for producto_id, vecino, puntaje in filas:
+            listas[producto_id].append((vecino, puntaje))
+    return listas
+
+def quitar_de_listas(session, ids):
+    # Un producto editado puede haber dejado de parecerse a quien lo tenía en
+    # su lista: se le quita de todas. No hace commit.
+    if not soportado(session):
+        return
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANO_LOTE):
+        lote = ids[i:i + TAMANO_LOTE]
+        marcadores = ", ".join(f":id{n}" for n in range(len(lote)))
+        session.execute(
+            text(f"DELETE FROM {TABLA} WHERE relacionado_id IN ({marcadores})"),
+            {f"id{n}": producto_id for n, producto_id in enumerate(lote)}
+        )
+
+def actualizar_productos(session, ids, k=K, quitar=True):
+    # Recalcula los vecinos de productos nuevos o editados y los propone como
+    # vecinos de sus vecinos. No hace commit. Al actualizar muchos productos
+    # por lotes, quien llama hace quitar_de_listas() con todos antes del
+    # primero y pasa quitar=False: si no, cada lote borraría de las listas
+    # recién calculadas a los productos del lote siguiente.
+    if not soportado(session):
+        return
+    ids = list(ids)
+    if not ids:
+        return
+    # Primero sólo lecturas; las escrituras van al final para que el lock de
+    # escritura dure lo mínimo
+    nuevas = calcular_vecinos(session, ids, k=k)
+    if quitar:
+        quitar_de_listas(session, ids)
+    _reemplazar_listas(session, nuevas)
+
+    # La similitud es simétrica: p entra en la lista de su vecino v si la mejora
+    propuestas = {}
+    for producto_id, vecinos in nuevas.items():
+        for vecino, puntaje in vecinos:
+            if vecino not in nuevas:
+                propuestas.setdefault(vecino, []).append((producto_id, puntaje))
+    if not propuestas:
+        return
+    cambios = {}
+    for vecino, lista in _listas_actuales(session, propuestas).items():
+        combinada = dict(lista)
+        combinada.update(propuestas[vecino])
+        mejores = sorted(combinada.items(), key=lambda x: (-x[1], x[0]))[:k]
+        if set(mejores) != set(lista):
+            cambios[vecino] = mejores
+    _reemplazar_listas(session, cambios)
+
+def reconstruir(session, k=K, progreso=None):
+    # Recalcula todas las listas por lotes de ids. No hace commit entre lotes:
+    # quien llama decide (el comando CLI confirma cada lote).
+    if not soportado(session):
+        return 0
+    crear_vocabulario(session)
+    vocab = Vocabulario(session, completo=True)
+    session.execute(text(f"DELETE FROM {TABLA}"))
+    hechos, ultimo = 0, 0
+    while True:
+        ids = session.execute(
+            text("SELECT id FROM producto WHERE id > :ultimo ORDER BY id LIMIT :limite"),
+            {"ultimo": ultimo, "limite": TAMANO_LOTE}
+        ).scalars().all()
+        if not ids:
+            break
+        _reemplazar_listas(session, calcular_vecinos(session, ids, vocab=vocab, k=k))
+        hechos += len(ids)
+        ultimo = ids[-1]
+        if progreso:
+            progreso(hechos)
+    return hechos
+
+def relacionados(session, producto_id, k=K):
+    # Lectura de la lista precalculada: k filas por la clave primaria
+    return session.execute(
+        text(f"SELECT relacionado_id FROM {TABLA} WHERE producto_id = :id ORDER BY puntaje DESC, relacionado_id LIMIT :k"),
+        {"id": producto_id, "k": k}
+    ).scalars().all()
@@ -0,0 +1,100 @@
+# ───── RESPUESTAS ─────
+# Utilidades de respuesta compartidas por los blueprints: caché de respuestas
+# de lectura con ETag e invalidación por tienda, compresión gzip/brotli y
+# serialización según Accept.
+import functools
+from flask import Response, current_app, request, make_response
+import serializacion
+import servicios
+
+def etiqueta_tienda(slug):
+    return f"tienda:{slug}"
+
+def invalidar_tienda(slug, lista=False):
+    # Llamar después del commit. lista=True también invalida /api/tiendas
+    etiquetas = [etiqueta_tienda(slug)]
+    if lista:
+        etiquetas.append("tiendas")
+    servicios.actuales().cache_respuestas.invalidar(*etiquetas)
+
+def respuesta_cacheada(etiquetas):
+    # Cachea las respuestas 200 de la vista y responde con ETag fuerte;
+    # If-None-Match con el mismo ETag devuelve 304 sin cuerpo.
+    # etiquetas(**kwargs de la vista) -> etiquetas de las que depende la respuesta
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(**kwargs):
+            # La vista puede responder en otro formato según Accept
+            cache_respuestas = servicios.actuales().cache_respuestas
+            clave = request.full_path + ' ' + serializacion.negociar(request.accept_mimetypes)
+            entrada = cache_respuestas.obtener(clave)
+            if entrada is None:
+                tags = etiquetas(**kwargs)
+                version = cache_respuestas.version(tags)
+                resp = make_response(vista(**kwargs))
+                if resp.status_code != 200:
+                    return resp
+                entrada = cache_respuestas.guardar(clave, resp.get_data(), resp.mimetype, tags, version)
+            codificacion = codificacion_respuesta(entrada.mimetype, len(entrada.cuerpo))
+            if codificacion:
+                # Se comprime una vez por entrada y codificación, no en cada acierto
+                cuerpo = entrada.comprimidos.get(codificacion)
+                if cuerpo is None:
+                    cuerpo = entrada.comprimidos[codificacion] = serializacion.comprimir(
+                        entrada.cuerpo, codificacion, current_app.config['COMPRESION_NIVEL_GZIP']
+                    )
+                resp = Response(cuerpo, mimetype=entrada.mimetype)
+                resp.headers['Content-Encoding'] = codificacion
+                resp.set_etag(f"{entrada.etag}-{codificacion}") # un ETag por representación
+            else:
+                resp = Response(entrada.cuerpo, mimetype=entrada.mimetype)
+                resp.set_etag(entrada.etag)
+            resp.vary.update(('Accept', 'Accept-Encoding'))
+            resp.headers['Cache-Control'] = f"public, max-age={current_app.config['CACHE_HTTP_MAX_AGE']}, must-revalidate"
+            return resp.make_conditional(request)
+        return envoltura
+    return decorador
+
+def codificacion_respuesta(mimetype, tamano=None):
+    # Codificación a usar con esta petición, o None (tamano=None: streaming)
+    if not current_app.config['COMPRESION'] or not serializacion.es_comprimible(mimetype):
+        return None
+    if tamano is not None and tamano < current_app.config['COMPRESION_MIN_BYTES']:
+        return None
+    return serializacion.elegir_codificacion(request.accept_encodings)
+
+def comprimir_respuesta(resp):
+    # after_request de la app, para las respuestas que no pasaron por
+    # respuesta_cacheada (listados en streaming, exportaciones, JSON grandes...)
+    if (resp.status_code != 200 or resp.direct_passthrough or 'Content-Encoding' in resp.headers
+            or not serializacion.es_comprimible(resp.mimetype)):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    if resp.is_streamed:
+        codificacion = codificacion_respuesta(resp.mimetype)
+        if codificacion:
+            resp.response = serializacion.comprimir_flujo(
+                resp.response, codificacion, current_app.config['COMPRESION_NIVEL_GZIP']
+            )
+            resp.headers.pop('Content-Length', None)
+    else:
+        codificacion = codificacion_respuesta(resp.mimetype, resp.content_length or 0)
+        if codificacion:
+            resp.set_data(serializacion.comprimir(resp.get_data(), codificacion, current_app.config['COMPRESION_NIVEL_GZIP']))
+    if codificacion:
+        resp.headers['Content-Encoding'] = codificacion
+        etag, debil = resp.get_etag()
+        if etag:
+            resp.set_etag(f"{etag}-{codificacion}", debil)
+    return resp
+
+def responder(datos, mimetype):
+    # JSON (orjson si está) o MessagePack, según lo negociado con Accept
+    return Response(serializacion.codificar(datos, mimetype), mimetype=mimetype)
+
+def url_imagen(imagen, slug):
+    if not imagen:
+        return ''
+    if imagen.startswith('http'):
+        return imagen
+    return f"/uploads/{slug}/{imagen}"
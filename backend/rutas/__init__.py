@@ -0,0 +1,9 @@
+# ───── RUTAS ─────
+# Un blueprint por grupo de endpoints; create_app() los registra todos.
+from rutas import tiendas, productos, leads, subidas
+
+BLUEPRINTS = (tiendas.bp, productos.bp, leads.bp, subidas.bp)
+
+def registrar(app):
+    for bp in BLUEPRINTS:
+        app.register_blueprint(bp)
@@ -0,0 +1,175 @@
+# ───── LEADS ─────
+# Registro de leads (clics de contacto) con escritura diferida en lotes, y
+# conteo y analítica por tienda desde el rollup lead_diario.
+import atexit
+import datetime
+from collections import Counter
+from flask import Blueprint, current_app, request, jsonify
+import basedatos
+import servicios
+from leads import BufferLeads
+from metricas import Contador, Indicador
+from modelos import db, transaccion, Tienda, Producto, Lead, LeadDiario
+
+bp = Blueprint('leads', __name__)
+
+SQL_SUMAR_LEAD_DIARIO = db.text("""
+    INSERT INTO lead_diario (tienda_id, dia, producto_id, total)
+    VALUES (:tienda_id, :dia, :producto_id, :total)
+    ON CONFLICT (tienda_id, dia, producto_id)
+    DO UPDATE SET total = lead_diario.total + excluded.total
+""").bindparams(db.bindparam('dia', type_=db.Date))
+
+def guardar_leads(app, lote):
+    # Un lote = un INSERT múltiple en Lead + un upsert por (tienda, día, producto)
+    # en lead_diario, todo en la misma transacción. Se llama desde el hilo del
+    # buffer, por eso recibe la app.
+    def guardar():
+        db.session.execute(db.insert(Lead), lote)
+        conteo = Counter((l['tienda_id'], l['fecha'].date(), l['producto_id']) for l in lote)
+        db.session.execute(SQL_SUMAR_LEAD_DIARIO, [
+            {"tienda_id": tienda_id, "dia": dia, "producto_id": producto_id, "total": total}
+            for (tienda_id, dia, producto_id), total in conteo.items()
+        ])
+        db.session.commit()
+
+    with app.app_context():
+        try:
+            transaccion(guardar)
+        except Exception:
+            db.session.rollback()
+            raise
+
+@bp.record_once
+def iniciar_buffer(estado):
+    app = estado.app
+    metricas = app.extensions[servicios.CLAVE].metricas
+    descartados = metricas.registrar(Contador(
+        'paratodos_leads_descartados_total', "Leads que no se pudieron guardar y se descartaron"
+    ))
+    buffer_leads = BufferLeads(
+        lambda lote: guardar_leads(app, lote),
+        intervalo=app.config['LEADS_BUFFER_INTERVALO_MS'] / 1000,
+        max_lote=app.config['LEADS_BUFFER_MAX_LOTE'],
+        reintentable=basedatos.es_error_transitorio,
+        max_reintentos=app.config['LEADS_BUFFER_MAX_REINTENTOS'],
+        espera_max=app.config['LEADS_BUFFER_ESPERA_MS'] / 1000,
+        al_descartar=lambda lote, error: descartados.inc(cantidad=len(lote)),
+        # El hilo no se crea aquí (al importar la app) sino con el primer lead
+        # de cada proceso: los hilos no pasan a los workers tras un fork
+        automatico=app.config['LEADS_BUFFER']
+    )
+    app.extensions[servicios.CLAVE].buffer_leads = buffer_leads
+    metricas.registrar(Indicador(
+        'paratodos_leads_pendientes', "Leads en el buffer a la espera de escribirse", buffer_leads.pendientes
+    ))
+    if app.config['LEADS_BUFFER']:
+        atexit.register(buffer_leads.detener)
+
+@bp.route('/api/leads', methods=['POST'])
+def crear_lead():
+    data = request.get_json(silent=True) or {}
+    try:
+        producto_id = int(data.get('producto_id') or 0)
+        tienda_id = int(data.get('tienda_id') or 0)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "producto_id y tienda_id deben ser números"}), 400
+
+    if not producto_id or not tienda_id:
+        return jsonify({"success": False, "error": "Faltan datos (producto_id, tienda_id)"}), 400
+
+    # Una sola consulta valida producto, tienda y pertenencia
+    fila = (
+        db.session.query(Producto.tienda_id, Tienda.id)
+        .outerjoin(Tienda, Tienda.id == tienda_id)
+        .filter(Producto.id == producto_id)
+        .first()
+    )
+    if not fila:
+         return jsonify({"success": False, "error": "Producto no encontrado"}), 404
+    if fila[1] is None:
+         return jsonify({"success": False, "error": "Tienda no encontrada"}), 404
+    if fila[0] != tienda_id:
+         return jsonify({"success": False, "error": "El producto no pertenece a la tienda especificada"}), 400
+
+    lead = {
+        "producto_id": producto_id,
+        "tienda_id": tienda_id,
+        "fecha": datetime.datetime.utcnow(),
+        "estado": "pendiente"
+    }
+    if not current_app.config['LEADS_BUFFER']:
+        try:
+            guardar_leads(current_app._get_current_object(), [lead])
+        except Exception as e:
+            print("Error al crear lead:", e)
+            return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify({"success": True, "message": "Lead creado"}), 201
+
+    if not servicios.actuales().buffer_leads.agregar(lead):
+        return jsonify({"success": False, "error": "Demasiados leads pendientes; intenta de nuevo"}), 503
+    return jsonify({"success": True, "message": "Lead registrado"}), 202
+
+@bp.route('/api/leads/<slug>', methods=['GET'])
+def obtener_leads_tienda(slug):
+    tienda = Tienda.query.filter_by(slug=slug).first()
+    if not tienda:
+        return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+    
+    try:
+        count = (
+            db.session.query(db.func.coalesce(db.func.sum(LeadDiario.total), 0))
+            .filter(LeadDiario.tienda_id == tienda.id)
+            .scalar()
+        )
+        return jsonify({ "success": True, "count": count })
+    except Exception as e:
+        print(f"Error al obtener leads para tienda {slug}:", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route('/api/leads/<slug>/analitica', methods=['GET'])
+def analitica_leads_tienda(slug):
+    # Serie diaria y productos más consultados de los últimos ?dias=30 (?top=10)
+    tienda = Tienda.query.filter_by(slug=slug).first()
+    if not tienda:
+        return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+
+    dias = min(max(request.args.get('dias', 30, type=int), 1), 366)
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    hasta = datetime.datetime.utcnow().date()
+    desde = hasta - datetime.timedelta(days=dias - 1)
+
+    por_dia = dict(
+        db.session.query(LeadDiario.dia, db.func.sum(LeadDiario.total))
+        .filter(LeadDiario.tienda_id == tienda.id, LeadDiario.dia >= desde)
+        .group_by(LeadDiario.dia)
+        .all()
+    )
+    serie = []
+    for n in range(dias):
+        dia = desde + datetime.timedelta(days=n)
+        serie.append({ "fecha": dia.isoformat(), "total": int(por_dia.get(dia, 0)) })
+
+    total_leads = db.func.sum(LeadDiario.total).label('total')
+    filas = (
+        db.session.query(LeadDiario.producto_id, Producto.nombre, total_leads)
+        .outerjoin(Producto, Producto.id == LeadDiario.producto_id)
+        .filter(LeadDiario.tienda_id == tienda.id, LeadDiario.dia >= desde)
+        .group_by(LeadDiario.producto_id, Producto.nombre)
+        .order_by(total_leads.desc(), LeadDiario.producto_id)
+        .limit(top)
+        .all()
+    )
+    top_productos = [
+        { "producto_id": producto_id, "nombre": nombre, "total": int(total) }
+        for producto_id, nombre, total in filas
+    ]
+
+    return jsonify({
+        "success": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "total": sum(d["total"] for d in serie),
+        "serie": serie,
+        "top_productos": top_productos
+    })
@@ -0,0 +1,590 @@
+# ───── PRODUCTOS ─────
+# Listados (por tienda y global con cursor), ficha, alta y edición, búsqueda
+# de texto completo e importación/exportación de catálogos.
+import os
+import csv
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+import busqueda
+import imagenes
+import importacion
+import recomendaciones
+import serializacion
+import servicios
+from precios import parsear_precio
+from modelos import db, transaccion, Tienda, Producto
+from respuestas import respuesta_cacheada, etiqueta_tienda, invalidar_tienda, responder, url_imagen
+from servicios import en_segundo_plano
+from trabajos import actualizar_relacionados
+from rutas.subidas import usar_imagen_subida
+
+bp = Blueprint('productos', __name__)
+
+TAMANO_LOTE_PRODUCTOS = 500   # filas por SELECT al recorrer el catálogo
+MAX_LIMITE_PAGINA = 1000      # tope para ?limit en listados paginados
+MAX_LIMITE_BUSQUEDA = 100
+
+CAMPOS_PRODUCTO = (
+    'id', 'nombre', 'descripcion', 'precio', 'precio_valor', 'relacionados',
+    'imagen', 'imagen_variantes', 'slug', 'telefono', 'instagram', 'tienda_id'
+)
+CAMPOS_PRODUCTO_TIENDA = (
+    'id', 'nombre', 'descripcion', 'precio', 'precio_valor', 'relacionados',
+    'imagen', 'imagen_variantes', 'tienda_id', 'telefono'
+)
+COLUMNAS_CAMPO = {
+    'id': (Producto.id,),
+    'nombre': (Producto.nombre,),
+    'descripcion': (Producto.descripcion,),
+    'precio': (Producto.precio,),
+    'precio_valor': (Producto.precio_valor,),
+    'relacionados': (Producto.relacionados,),
+    'imagen': (Producto.imagen, Tienda.slug),
+    'imagen_variantes': (Producto.imagen, Tienda.slug),
+    'slug': (Tienda.slug,),
+    'telefono': (Tienda.telefono,),
+    'instagram': (Tienda.instagram,),
+    'tienda_id': (Producto.tienda_id,),
+}
+
+def leer_campos(permitidos):
+    # ?fields=id,nombre,precio -> esos campos, en el orden habitual; sin ?fields, todos
+    valor = request.args.get('fields')
+    if not valor:
+        return permitidos
+    pedidos = {c.strip() for c in valor.split(',') if c.strip()}
+    desconocidos = pedidos - set(permitidos)
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos en fields: {', '.join(sorted(desconocidos))}")
+    return tuple(c for c in permitidos if c in pedidos)
+
+def columnas_producto(campos, con_tienda=True, extra=()):
+    # Sólo las columnas que piden los campos (más el id, que hace de cursor)
+    columnas, vistas = [], set()
+    for campo in ('id',) + tuple(campos):
+        for columna in COLUMNAS_CAMPO[campo] + tuple(extra):
+            if (columna.class_ is Tienda and not con_tienda) or (columna.class_, columna.key) in vistas:
+                continue
+            vistas.add((columna.class_, columna.key))
+            columnas.append(columna)
+    return columnas
+
+def producto_a_dict(fila, campos, tienda=None):
+    # tienda: slug/telefono/instagram fijos (listado de una tienda); si no, vienen en la fila
+    datos = fila._mapping
+    def de_tienda(campo):
+        return tienda[campo] if tienda is not None else (datos[campo] or '')
+    producto = {}
+    for campo in campos:
+        if campo == 'imagen':
+            producto[campo] = url_imagen(datos['imagen'], de_tienda('slug'))
+        elif campo == 'imagen_variantes':
+            producto[campo] = imagenes.urls_variantes(datos['imagen'], de_tienda('slug'))
+        elif campo in ('slug', 'telefono', 'instagram'):
+            producto[campo] = de_tienda(campo)
+        else:
+            producto[campo] = datos[campo]
+    return producto
+
+def consulta_lote_productos(cursor, tamano, columnas, min_precio=None, max_precio=None, orden='id'):
+    # Producto ⋈ Tienda (si hace falta) en una sola consulta. El cursor es el
+    # último id, o (precio_valor, id) al ordenar por precio; ambos recorridos
+    # van por índice (la PK o ix_producto_precio) y sin ordenar en memoria.
+    q = db.select(*columnas)
+    if any(c.class_ is Tienda for c in columnas):
+        q = q.select_from(Producto).outerjoin(Tienda, Producto.tienda_id == Tienda.id)
+    # Ordenando por id, el filtro de precio se evalúa fila a fila sobre la PK
+    # (+ 0 impide usar ix_producto_precio): con el índice, SQLite leería todo
+    # el rango de precios y lo ordenaría por id en cada lote
+    precio = Producto.precio_valor if orden == 'precio' else Producto.precio_valor + 0
+    if min_precio is not None:
+        q = q.where(precio >= min_precio)
+    if max_precio is not None:
+        q = q.where(precio <= max_precio)
+    if orden == 'precio':
+        q = q.where(Producto.precio_valor.isnot(None))
+        if cursor is not None:
+            q = q.where(db.tuple_(Producto.precio_valor, Producto.id) > cursor)
+        q = q.order_by(Producto.precio_valor, Producto.id)
+    else:
+        if cursor is not None:
+            q = q.where(Producto.id > cursor)
+        q = q.order_by(Producto.id)
+    return q.limit(tamano)
+
+def consultar_lote_productos(cursor, tamano, columnas, **filtros):
+    servicios.actuales().metricas.recorrido_por_lotes() # la misma consulta por lote no es un N+1
+    return db.session.execute(consulta_lote_productos(cursor, tamano, columnas, **filtros)).all()
+
+def leer_numero(nombre, tipo):
+    # Como request.args.get(nombre, type=tipo), pero un valor que no es un
+    # número es un error y no un parámetro ausente
+    valor = request.args.get(nombre, '')
+    if not valor:
+        return None
+    try:
+        return tipo(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número{' entero' if tipo is int else ''}")
+
+def leer_cursor(after, orden):
+    # ?after=<id> ordenando por id, ?after=<precio>:<id> ordenando por precio
+    if not after:
+        return None
+    if orden == 'precio':
+        precio, _, producto_id = after.rpartition(':')
+        return (float(precio), int(producto_id))
+    return int(after)
+
+def escribir_cursor(producto, orden):
+    if orden == 'precio':
+        return f"{producto.precio_valor!r}:{producto.id}"
+    return producto.id
+
+# --- Endpoints de Producto ---
+
+@bp.route('/api/productos/<slug>', methods=['GET'])
+@respuesta_cacheada(lambda slug: [etiqueta_tienda(slug)])
+def obtener_productos(slug):
+    # ?fields=id,nombre,precio,imagen limita la respuesta y las columnas leídas
+    try:
+        campos = leer_campos(CAMPOS_PRODUCTO_TIENDA)
+    except ValueError as e:
+        return jsonify({ "success": False, "error": str(e) }), 400
+    tienda = Tienda.query.filter_by(slug=slug).first()
+    if not tienda:
+        return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+
+    # Los datos de la tienda son los mismos en cada producto: no se leen por fila
+    valores_tienda = { "slug": slug, "telefono": tienda.telefono, "instagram": tienda.instagram }
+    filas = db.session.execute(
+        db.select(*columnas_producto(campos, con_tienda=False))
+        .where(Producto.tienda_id == tienda.id)
+        .order_by(Producto.id)
+    ).all()
+    lista = [producto_a_dict(f, campos, valores_tienda) for f in filas]
+    return responder({ "success": True, "productos": lista }, serializacion.negociar(request.accept_mimetypes))
+
+@bp.route('/api/producto/<int:id>', methods=['GET'])
+def obtener_producto(id):
+    # Un solo SELECT con LEFT JOIN en lugar de dos búsquedas separadas
+    fila = (
+        db.session.query(Producto, Tienda)
+        .outerjoin(Tienda, Producto.tienda_id == Tienda.id)
+        .filter(Producto.id == id)
+        .first()
+    )
+    if not fila:
+        return jsonify({ "success": False, "error": "Producto no encontrado" }), 404
+
+    producto, tienda = fila
+    slug = tienda.slug if tienda else ""
+
+    img_url = url_imagen(producto.imagen, slug)
+    tienda_info = {
+        "id": tienda.id if tienda else None,
+        "nombre": tienda.nombre if tienda else None,
+        "slug": slug,
+        "instagram": tienda.instagram if tienda and tienda.instagram else None,
+        "telefono": tienda.telefono if tienda and tienda.telefono else None
+    }
+    return jsonify({
+        "success": True,
+        "producto": {
+            "id": producto.id,
+            "nombre": producto.nombre,
+            "descripcion": producto.descripcion,
+            "precio": producto.precio,
+            "precio_valor": producto.precio_valor,
+            "relacionados": producto.relacionados,
+            "relacionados_ids": recomendaciones.relacionados(db.session, producto.id, k=current_app.config['RELACIONADOS_K']),
+            "imagen": img_url,
+            "imagen_variantes": imagenes.urls_variantes(producto.imagen, slug),
+            "tienda": tienda_info 
+        }
+    })
+
+@bp.route('/api/producto/<int:id>', methods=['PUT'])
+def editar_producto(id):
+    # ... (código existente para editar producto)
+    producto = db.session.get(Producto, id)
+    if not producto:
+        return jsonify({ "success": False, "error": "Producto no encontrado" }), 404
+
+    data = request.form
+    slug = data['slug'] # Se necesita para la carpeta de imagen
+
+    imagen_filename = None
+    if data.get('imagen_subida_id'):
+        if not Tienda.query.filter_by(slug=slug).first():
+            return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+        try:
+            imagen_filename = usar_imagen_subida(data['imagen_subida_id'], os.path.join(current_app.config['UPLOAD_FOLDER'], slug))
+        except ValueError as e:
+            return jsonify({ "success": False, "error": str(e) }), 400
+    elif 'imagen' in request.files:
+        imagen = request.files['imagen']
+        if imagen.filename:
+            # Necesitamos obtener la tienda para construir la ruta
+            # Podríamos obtenerla del producto.tienda_id si tuviéramos la relación, 
+            # o buscarla por slug como se hace aquí (requiere que el slug se envíe)
+            tienda = Tienda.query.filter_by(slug=slug).first()
+            if tienda:
+                tienda_path = os.path.join(current_app.config['UPLOAD_FOLDER'], slug)
+                try:
+                    imagen_filename = imagenes.guardar_imagen(imagen, tienda_path)
+                except ValueError as e:
+                    return jsonify({ "success": False, "error": str(e) }), 400
+            else:
+                 print(f"Advertencia: No se encontró tienda con slug {slug} al intentar guardar imagen para producto {id}")
+
+    def guardar():
+        producto = db.session.get(Producto, id)
+        producto.nombre = data['nombre']
+        producto.descripcion = data['descripcion']
+        producto.precio = data['precio']
+        producto.relacionados = data.get('relacionados', '')
+        if imagen_filename:
+            producto.imagen = imagen_filename
+        busqueda.indexar_productos(db.session, [producto.id])
+        db.session.commit()
+        return producto
+
+    producto = transaccion(guardar)
+    actualizar_relacionados([id])
+    # El producto puede no pertenecer a la tienda del slug recibido
+    tienda_producto = db.session.get(Tienda, producto.tienda_id) if producto.tienda_id else None
+    if tienda_producto:
+        invalidar_tienda(tienda_producto.slug)
+    return jsonify({ "success": True, "message": "Producto actualizado" })
+
+@bp.route('/api/crear-producto', methods=['POST'])
+def crear_producto():
+    # ... (código existente para crear producto)
+    try:
+        data = request.form
+        nombre = data['nombre']
+        descripcion = data['descripcion']
+        precio = data['precio']
+        relacionados = data.get('relacionados', '')
+        slug = data['slug'] # Necesario para encontrar tienda_id
+
+        tienda = Tienda.query.filter_by(slug=slug).first()
+        if not tienda:
+            return jsonify({"success": False, "error": "Tienda no encontrada"}), 404
+
+        imagen_filename = ''
+        tienda_path = os.path.join(current_app.config['UPLOAD_FOLDER'], slug)
+        if data.get('imagen_subida_id'):
+            imagen_filename = usar_imagen_subida(data['imagen_subida_id'], tienda_path)
+        elif 'imagen' in request.files:
+            imagen = request.files['imagen']
+            if imagen.filename:
+                imagen_filename = imagenes.guardar_imagen(imagen, tienda_path)
+
+        def guardar():
+            nuevo_producto = Producto(
+                nombre=nombre,
+                descripcion=descripcion,
+                precio=precio,
+                relacionados=relacionados,
+                tienda_id=tienda.id, 
+                imagen=imagen_filename
+            )
+
+            db.session.add(nuevo_producto)
+            db.session.flush()
+            busqueda.indexar_productos(db.session, [nuevo_producto.id])
+            db.session.commit()
+            return nuevo_producto.id
+
+        producto_id = transaccion(guardar)
+        actualizar_relacionados([producto_id])
+        invalidar_tienda(slug)
+
+        return jsonify({ "success": True, "message": "Producto creado correctamente" })
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        print("Error al crear producto:", e)
+        return jsonify({ "success": False, "error": str(e) }), 400
+
+@bp.route('/api/productos', methods=['GET'])
+def listar_todos_productos():
+    # Paginación por cursor (keyset): ?after=<cursor>&limit=<n>
+    # Sin ?limit se recorre todo el catálogo por lotes, igual que antes pero sin
+    # cargarlo entero en memoria. La respuesta se envía en streaming.
+    # Filtros opcionales: ?min_precio=&max_precio=&orden=precio|id. Con filtro
+    # de precio el orden por defecto es precio, que recorre ix_producto_precio;
+    # ?orden=id recorre la PK y descarta las filas fuera del rango.
+    # orden=precio sólo incluye productos con precio numérico: los que no lo
+    # tienen (precio_valor nulo, p. ej. "Consultar") se listan con orden=id.
+    # ?fields=id,nombre,precio,imagen limita la respuesta y las columnas leídas.
+    # Con Accept: application/msgpack (y ?limit) responde en MessagePack.
+    try:
+        limit = leer_numero('limit', int)
+        min_precio = leer_numero('min_precio', float)
+        max_precio = leer_numero('max_precio', float)
+    except ValueError as e:
+        return jsonify({ 'success': False, 'error': str(e) }), 400
+    filtra_precio = min_precio is not None or max_precio is not None
+    orden = request.args.get('orden') or ('precio' if filtra_precio else 'id')
+    if orden not in ('id', 'precio'):
+        return jsonify({ 'success': False, 'error': 'orden debe ser id o precio' }), 400
+    try:
+        cursor = leer_cursor(request.args.get('after', ''), orden)
+    except ValueError:
+        return jsonify({ 'success': False, 'error': 'Cursor after inválido' }), 400
+    if limit is not None and limit <= 0:
+        return jsonify({ 'success': False, 'error': 'limit debe ser mayor que 0' }), 400
+    if limit is not None:
+        limit = min(limit, MAX_LIMITE_PAGINA)
+    try:
+        campos = leer_campos(CAMPOS_PRODUCTO)
+    except ValueError as e:
+        return jsonify({ 'success': False, 'error': str(e) }), 400
+    columnas = columnas_producto(campos, extra=(Producto.precio_valor,) if orden == 'precio' else ())
+    filtros = { 'min_precio': min_precio, 'max_precio': max_precio, 'orden': orden }
+
+    def recorrer(estado):
+        # Genera los productos por lotes y deja en estado['siguiente'] el cursor
+        ultimo = cursor
+        enviados = 0
+        hay_mas = False
+        while True:
+            tamano = TAMANO_LOTE_PRODUCTOS
+            if limit is not None:
+                tamano = min(tamano, limit - enviados)
+                if tamano <= 0:
+                    # Miramos si queda al menos una fila para devolver el cursor
+                    hay_mas = bool(consultar_lote_productos(ultimo, 1, [Producto.id], **filtros))
+                    break
+            filas = consultar_lote_productos(ultimo, tamano, columnas, **filtros)
+            if filas:
+                yield [producto_a_dict(f, campos) for f in filas]
+                enviados += len(filas)
+                ultima_fila = filas[-1]
+                ultimo = (ultima_fila.precio_valor, ultima_fila.id) if orden == 'precio' else ultima_fila.id
+            if len(filas) < tamano:
+                break
+        estado['siguiente'] = escribir_cursor(ultima_fila, orden) if hay_mas else None
+
+    mimetype = serializacion.negociar(request.accept_mimetypes)
+    if mimetype == serializacion.MIMETYPE_MSGPACK and limit is not None:
+        # Una página acotada por MAX_LIMITE_PAGINA: se puede armar en memoria
+        estado = {}
+        productos = [p for lote in recorrer(estado) for p in lote]
+        return responder({ 'success': True, 'productos': productos, 'siguiente': estado['siguiente'] }, mimetype)
+
+    def generar():
+        estado = {}
+        yield b'{"success":true,"productos":['
+        primero = True
+        for lote in recorrer(estado):
+            trozo = b','.join(serializacion.a_json(p) for p in lote)
+            yield trozo if primero else b',' + trozo
+            primero = False
+        yield b'],"siguiente":' + serializacion.a_json(estado['siguiente']) + b'}'
+
+    return Response(stream_with_context(generar()), mimetype='application/json')
+
+@bp.route('/api/buscar', methods=['GET'])
+def buscar_productos():
+    # Búsqueda de texto completo con ranking bm25: ?q=&tienda=<slug>&limit=
+    q = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_LIMITE_BUSQUEDA)
+    tienda_slug = request.args.get('tienda')
+
+    tienda_id = None
+    if tienda_slug:
+        tienda = Tienda.query.filter_by(slug=tienda_slug).first()
+        if not tienda:
+            return jsonify({ 'success': False, 'error': 'Tienda no encontrada' }), 404
+        tienda_id = tienda.id
+
+    filas = busqueda.buscar(db.session, q, tienda_id=tienda_id, limit=limit)
+    lista = []
+    for f in filas:
+        lista.append({
+            'id': f['id'],
+            'nombre': f['nombre'],
+            'descripcion': f['descripcion'],
+            'precio': f['precio'],
+            'imagen': url_imagen(f['imagen'], f['slug'] or ''),
+            'imagen_variantes': imagenes.urls_variantes(f['imagen'], f['slug'] or ''),
+            'slug': f['slug'] or '',
+            'tienda': f['tienda'] or '',
+            'tienda_id': f['tienda_id']
+        })
+    return jsonify({ 'success': True, 'q': q, 'productos': lista })
+
+# --- Importación y exportación de catálogos (CSV / NDJSON) ---
+
+TAMANO_LOTE_IMPORTACION = 1000 # filas por INSERT múltiple
+MAX_ERRORES_INFORMADOS = 1000  # el resto sólo se cuenta
+
+def importar_lote(tienda_id, filas, modo):
+    # Escribe un lote de filas validadas; devuelve (ids escritos, insertados,
+    # actualizados), contados por producto escrito
+    vacio = { 'descripcion': '', 'precio': '', 'relacionados': '', 'imagen': '' }
+    nuevos, cambios = [], []
+    if modo == 'upsert':
+        # Dentro del lote, varias filas con el mismo nombre se combinan (gana
+        # la última) antes de decidir si el producto es nuevo o existente
+        por_nombre = {}
+        for fila in filas:
+            por_nombre.setdefault(fila['nombre'], {}).update(fila)
+        existentes = {}
+        for producto_id, nombre in db.session.execute(
+            db.select(Producto.id, Producto.nombre)
+            .where(Producto.tienda_id == tienda_id, Producto.nombre.in_(list(por_nombre)))
+        ):
+            existentes.setdefault(nombre, []).append(producto_id)
+        for nombre, fila in por_nombre.items():
+            if nombre in existentes:
+                cambios.extend(dict(fila, id=producto_id) for producto_id in existentes[nombre])
+            else:
+                nuevos.append(fila)
+    else:
+        nuevos = filas
+
+    # Inserciones y actualizaciones masivas: sin pasar por @validates
+    for fila in nuevos + cambios:
+        if 'precio' in fila:
+            fila['precio_valor'] = parsear_precio(fila['precio'])
+    ids = []
+    if nuevos:
+        ids = db.session.scalars(
+            db.insert(Producto).returning(Producto.id, sort_by_parameter_order=True),
+            [dict(vacio, **fila, tienda_id=tienda_id) for fila in nuevos]
+        ).all()
+    if cambios:
+        db.session.execute(db.update(Producto), cambios)
+        ids.extend(fila['id'] for fila in cambios)
+    return ids, len(nuevos), len(cambios)
+
+@bp.route('/api/tienda/<slug>/productos/import', methods=['POST'])
+def importar_productos(slug):
+    # Cuerpo CSV (cabecera nombre,descripcion,precio,...) o NDJSON, directo o
+    # como archivo 'archivo' en multipart. ?modo=upsert actualiza por nombre
+    # dentro de la tienda; ?atomico=1 descarta todo si alguna fila falla.
+    # Todo va en una transacción: o entra el catálogo (sin las filas con
+    # error) o no entra nada. El cuerpo se recibe entero antes de abrirla.
+    tienda = Tienda.query.filter_by(slug=slug).first()
+    if not tienda:
+        return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+    modo = request.args.get('modo', 'insertar')
+    if modo not in ('insertar', 'upsert'):
+        return jsonify({ "success": False, "error": "modo debe ser 'insertar' o 'upsert'" }), 400
+    atomico = request.args.get('atomico') == '1'
+    # El cuerpo se procesa en streaming: admite más que MAX_CONTENT_LENGTH
+    request.max_content_length = current_app.config['IMPORTACION_MAX_BYTES']
+
+    archivo = request.files.get('archivo')
+    if archivo:
+        # Werkzeug ya guardó la parte multipart en un temporal
+        flujo = archivo.stream
+        formato = importacion.detectar_formato(archivo.mimetype, request.args.get('formato'))
+        if not formato and archivo.filename:
+            extension = archivo.filename.rsplit('.', 1)[-1].lower()
+            formato = 'ndjson' if extension in ('ndjson', 'jsonl') else 'csv' if extension == 'csv' else None
+    else:
+        flujo = request.stream
+        formato = importacion.detectar_formato(request.content_type, request.args.get('formato'))
+    if not formato:
+        return jsonify({ "success": False, "error": "Formato no soportado: CSV o NDJSON (Content-Type o ?formato=)" }), 415
+    if not archivo:
+        flujo = importacion.copiar_cuerpo(flujo)
+
+    tienda_id = tienda.id
+    resumen = { "filas": 0, "insertados": 0, "actualizados": 0, "total_errores": 0 }
+    errores, escritos, lote = [], [], []
+
+    def error(numero, mensaje):
+        resumen["total_errores"] += 1
+        if len(errores) < MAX_ERRORES_INFORMADOS:
+            errores.append({ "fila": numero, "error": mensaje })
+
+    def escribir_lote():
+        ids, insertados, actualizados = importar_lote(tienda_id, lote, modo)
+        busqueda.indexar_productos(db.session, ids)
+        escritos.extend(ids)
+        resumen["insertados"] += insertados
+        resumen["actualizados"] += actualizados
+        lote.clear()
+
+    # Sin reintentos (el resumen se arma fila a fila): con DB_MODO=produccion
+    # busy_timeout espera a que se libere el lock
+    servicios.actuales().metricas.recorrido_por_lotes()
+    try:
+        for numero, fila in importacion.leer_filas(flujo, formato):
+            resumen["filas"] = numero
+            if isinstance(fila, Exception):
+                error(numero, str(fila))
+                continue
+            try:
+                lote.append(importacion.validar_fila(fila))
+            except ValueError as e:
+                error(numero, str(e))
+                continue
+            if len(lote) >= TAMANO_LOTE_IMPORTACION:
+                escribir_lote()
+        if lote:
+            escribir_lote()
+        if atomico and resumen["total_errores"]:
+            db.session.rollback()
+            return jsonify({ "success": False, "error": "Hay filas con errores; no se importó nada",
+                             **resumen, "insertados": 0, "actualizados": 0, "errores": errores }), 422
+        db.session.commit()
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({ "success": False, "error": f"No se pudo leer el archivo: {e}" }), 400
+    except Exception as e:
+        db.session.rollback()
+        print("Error al importar productos:", e)
+        return jsonify({ "success": False, "error": str(e) }), 400
+
+    invalidar_tienda(slug)
+    if escritos:
+        # Con catálogos grandes esto tarda: en segundo plano y por lotes
+        en_segundo_plano(actualizar_relacionados, escritos)
+    return jsonify({ "success": True, **resumen, "errores": errores })
+
+@bp.route('/api/tienda/<slug>/productos/export', methods=['GET'])
+def exportar_productos(slug):
+    # ?formato=csv (por defecto) o ndjson. Se recorre por lotes (keyset) y se
+    # envía en streaming; el CSV se puede volver a importar tal cual.
+    formato = request.args.get('formato', 'csv')
+    if formato not in importacion.FORMATOS:
+        return jsonify({ "success": False, "error": "formato debe ser 'csv' o 'ndjson'" }), 400
+    tienda = Tienda.query.filter_by(slug=slug).first()
+    if not tienda:
+        return jsonify({ "success": False, "error": "Tienda no encontrada" }), 404
+    tienda_id = tienda.id
+
+    def filas():
+        ultimo = 0
+        while True:
+            servicios.actuales().metricas.recorrido_por_lotes()
+            lote = db.session.execute(
+                db.select(
+                    Producto.id, Producto.nombre, Producto.descripcion, Producto.precio,
+                    Producto.precio_valor, Producto.relacionados, Producto.imagen
+                )
+                .where(Producto.tienda_id == tienda_id, Producto.id > ultimo)
+                .order_by(Producto.id)
+                .limit(TAMANO_LOTE_PRODUCTOS)
+            ).mappings().all()
+            if not lote:
+                return
+            yield from lote
+            ultimo = lote[-1]['id']
+
+    resp = Response(
+        stream_with_context(importacion.escribir(filas(), formato)),
+        mimetype=importacion.MIMETYPES[formato]
+    )
+    resp.headers['Content-Disposition'] = f'attachment; filename="{slug}-productos.{formato}"'
+    return resp
@@ -0,0 +1,293 @@
+# ───── SUBIDAS ─────
+# Subidas por trozos reanudables (el manejo del archivo parcial está en
+# subidas.py) y archivos servidos desde uploads/.
+#
+# POST /api/subidas {tipo, nombre, tamano} -> id
+# PUT /api/subidas/<id>?offset=N (o Content-Range) con el trozo como cuerpo
+# GET /api/subidas/<id> -> bytes recibidos, para reanudar
+# POST /api/subidas/<id>/finalizar {sha256 opcional}
+# El id de una subida completa se pasa luego como logo_subida_id /
+# catalogo_subida_id a crear-tienda o imagen_subida_id a los productos.
+import os
+import time
+import uuid
+import shutil
+import datetime
+from flask import Blueprint, abort, current_app, request, jsonify, send_from_directory
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+import subidas
+import imagenes
+from modelos import db, transaccion, Subida
+from servicios import en_segundo_plano
+
+bp = Blueprint('subidas', __name__)
+
+UN_ANO = 365 * 24 * 3600 # max-age de los archivos con nombre por hash
+
+def subida_a_dict(subida):
+    return {
+        "id": subida.id,
+        "tipo": subida.tipo,
+        "nombre": subida.nombre,
+        "tamano": subida.tamano,
+        "recibidos": subida.recibidos,
+        "estado": subida.estado,
+        "sha256": subida.sha256,
+    }
+
+@bp.route('/api/subidas', methods=['POST'])
+def iniciar_subida():
+    data = request.get_json(silent=True) or {}
+    tipo, nombre, tamano = data.get('tipo'), secure_filename(data.get('nombre') or ''), data.get('tamano')
+    try:
+        subidas.validar_inicio(tipo, nombre, tamano, current_app.config['SUBIDA_MAX_BYTES'].get(tipo, 0))
+    except ValueError as e:
+        return jsonify({ "success": False, "error": str(e) }), 413 if "máximo" in str(e) else 400
+
+    subida_id = uuid.uuid4().hex
+    subidas.crear_parcial(current_app.config['SUBIDAS_DIR'], subida_id)
+
+    def guardar():
+        db.session.add(Subida(id=subida_id, tipo=tipo, nombre=nombre, tamano=tamano))
+        db.session.commit()
+
+    transaccion(guardar)
+    barrer_subidas()
+    return jsonify({
+        "success": True, "id": subida_id, "tamano_max_trozo": current_app.config['SUBIDA_MAX_TROZO_BYTES']
+    }), 201
+
+@bp.route('/api/subidas/<subida_id>', methods=['GET'])
+def estado_subida(subida_id):
+    subida = db.session.get(Subida, subida_id) if subidas.PATRON_ID.match(subida_id) else None
+    if not subida:
+        return jsonify({ "success": False, "error": "Subida no encontrada" }), 404
+    return jsonify({ "success": True, "subida": subida_a_dict(subida) })
+
+@bp.route('/api/subidas/<subida_id>', methods=['PUT'])
+def subir_trozo(subida_id):
+    subida = db.session.get(Subida, subida_id) if subidas.PATRON_ID.match(subida_id) else None
+    if not subida:
+        return jsonify({ "success": False, "error": "Subida no encontrada" }), 404
+    if subida.estado != "subiendo":
+        return jsonify({ "success": False, "error": "La subida ya está finalizada" }), 409
+    try:
+        offset = subidas.leer_offset(request.args, request.headers)
+    except ValueError as e:
+        return jsonify({ "success": False, "error": str(e) }), 400
+    if offset is None:
+        return jsonify({ "success": False, "error": "Falta offset (?offset= o Content-Range)" }), 400
+    if offset != subida.recibidos:
+        # Otro trozo se perdió o se repite: el cliente debe seguir desde aquí
+        return jsonify({ "success": False, "error": "Offset incorrecto", "recibidos": subida.recibidos }), 409
+
+    maximo = min(current_app.config['SUBIDA_MAX_TROZO_BYTES'], subida.tamano - offset)
+    if request.content_length is not None and request.content_length > maximo:
+        return jsonify({ "success": False, "error": f"El trozo supera el máximo de {maximo} bytes" }), 413
+    # La sesión no debe tener una transacción abierta mientras llega el cuerpo
+    db.session.rollback()
+    # El trozo puede ser mayor que MAX_CONTENT_LENGTH; su límite es maximo
+    # (con None Flask volvería al MAX_CONTENT_LENGTH de la app)
+    request.max_content_length = maximo
+    directorio = current_app.config['SUBIDAS_DIR']
+    try:
+        trozo, escritos, hasher, completo = subidas.recibir_trozo(
+            directorio, subida_id, offset, request.stream, maximo
+        )
+    except subidas.TrozoDemasiadoGrande:
+        subidas.olvidar_hash(subida_id)
+        return jsonify({ "success": False, "error": f"El trozo supera el máximo de {maximo} bytes" }), 413
+    if not escritos:
+        subidas.descartar_trozo(trozo)
+        subidas.guardar_hash(subida_id, offset, hasher)
+        return jsonify({ "success": True, "recibidos": offset, "completo": completo })
+
+    def mover(desde, hasta):
+        # Sólo avanza (o retrocede) si los bytes confirmados siguen siendo
+        # los esperados: de varias peticiones con el mismo offset gana una
+        resultado = db.session.execute(
+            db.update(Subida)
+            .where(Subida.id == subida_id, Subida.recibidos == desde, Subida.estado == "subiendo")
+            .values(recibidos=hasta, actualizado=datetime.datetime.utcnow())
+        )
+        db.session.commit()
+        return resultado.rowcount
+
+    # Primero se reclama el offset y después se escribe en el parcial
+    if not transaccion(lambda: mover(offset, offset + escritos)):
+        subidas.descartar_trozo(trozo)
+        subidas.olvidar_hash(subida_id)
+        subida = db.session.get(Subida, subida_id)
+        return jsonify({ "success": False, "error": "Offset incorrecto", "recibidos": subida.recibidos }), 409
+    try:
+        subidas.aplicar_trozo(directorio, subida_id, offset, trozo)
+    except OSError as e:
+        print("❌ Error al escribir el trozo:", e)
+        subidas.olvidar_hash(subida_id)
+        recibidos = offset
+        if not transaccion(lambda: mover(offset + escritos, offset)):
+            # Otro trozo ya avanzó sobre este: el parcial tiene un hueco que
+            # el tamaño no delata, así que la subida vuelve a empezar
+            reiniciar_subida(subida_id)
+            recibidos = 0
+        return jsonify({ "success": False, "error": "No se pudo guardar el trozo", "recibidos": recibidos }), 500
+    subidas.guardar_hash(subida_id, offset + escritos, hasher)
+    return jsonify({ "success": True, "recibidos": offset + escritos, "completo": completo })
+
+@bp.route('/api/subidas/<subida_id>/finalizar', methods=['POST'])
+def finalizar_subida(subida_id):
+    subida = db.session.get(Subida, subida_id) if subidas.PATRON_ID.match(subida_id) else None
+    if not subida:
+        return jsonify({ "success": False, "error": "Subida no encontrada" }), 404
+    if subida.estado != "subiendo":
+        return jsonify({ "success": True, "subida": subida_a_dict(subida) })
+    if subida.recibidos != subida.tamano:
+        return jsonify({ "success": False, "error": "Faltan bytes por subir", "recibidos": subida.recibidos }), 409
+
+    directorio, tipo, tamano = current_app.config['SUBIDAS_DIR'], subida.tipo, subida.tamano
+    db.session.rollback()
+    if subidas.tamano_parcial(directorio, subida_id) != tamano:
+        # El contador dice completo pero el archivo no (un trozo confirmado
+        # que no llegó a escribirse): hay que volver a subirlo desde cero
+        reiniciar_subida(subida_id)
+        return jsonify({ "success": False, "error": "El archivo recibido está incompleto; la subida se reinició", "recibidos": 0 }), 409
+    try:
+        subidas.validar_contenido(directorio, subida_id, tipo)
+    except ValueError as e:
+        return jsonify({ "success": False, "error": str(e) }), 415
+    sha = subidas.sha256(directorio, subida_id, tamano)
+    esperado = (request.get_json(silent=True) or {}).get('sha256')
+    if esperado and esperado.lower() != sha:
+        # El archivo llegó corrupto: hay que volver a subirlo desde cero
+        reiniciar_subida(subida_id)
+        return jsonify({ "success": False, "error": "El sha256 no coincide; la subida se reinició", "sha256": sha }), 422
+
+    def completar():
+        subida = db.session.get(Subida, subida_id)
+        if subida.estado == "subiendo":
+            subida.estado = "completa"
+            subida.sha256 = sha
+            subida.actualizado = datetime.datetime.utcnow()
+        db.session.commit()
+        return subida_a_dict(subida)
+
+    return jsonify({ "success": True, "subida": transaccion(completar) })
+
+def reiniciar_subida(subida_id):
+    def reiniciar():
+        db.session.execute(
+            db.update(Subida).where(Subida.id == subida_id, Subida.estado == "subiendo")
+            .values(recibidos=0, actualizado=datetime.datetime.utcnow())
+        )
+        db.session.commit()
+    transaccion(reiniciar)
+    subidas.olvidar_hash(subida_id)
+    subidas.vaciar_parcial(current_app.config['SUBIDAS_DIR'], subida_id)
+
+@bp.route('/api/subidas/<subida_id>', methods=['DELETE'])
+def cancelar_subida(subida_id):
+    subida = db.session.get(Subida, subida_id) if subidas.PATRON_ID.match(subida_id) else None
+    if not subida:
+        return jsonify({ "success": False, "error": "Subida no encontrada" }), 404
+
+    def borrar():
+        db.session.execute(db.delete(Subida).where(Subida.id == subida_id))
+        db.session.commit()
+
+    transaccion(borrar)
+    subidas.olvidar_hash(subida_id)
+    subidas.eliminar_parcial(current_app.config['SUBIDAS_DIR'], subida_id)
+    return jsonify({ "success": True })
+
+def subida_lista(subida_id, tipo):
+    subida = db.session.get(Subida, subida_id) if subidas.PATRON_ID.match(subida_id or '') else None
+    return subida is not None and subida.tipo == tipo and subida.estado == "completa"
+
+def reclamar_subida(subida_id, tipo):
+    # Marca como usada una subida completa del tipo pedido, de forma atómica
+    # para que dos peticiones no se lleven el mismo archivo. Lanza ValueError
+    # si no existe, es de otro tipo o no está finalizada.
+    if not subidas.PATRON_ID.match(subida_id or ''):
+        raise ValueError("Subida no encontrada")
+
+    def reclamar():
+        resultado = db.session.execute(
+            db.update(Subida)
+            .where(Subida.id == subida_id, Subida.tipo == tipo, Subida.estado == "completa")
+            .values(estado="usada", actualizado=datetime.datetime.utcnow())
+        )
+        db.session.commit()
+        return resultado.rowcount
+
+    if not transaccion(reclamar):
+        raise ValueError("Subida no encontrada o sin finalizar")
+    return db.session.get(Subida, subida_id)
+
+def usar_imagen_subida(subida_id, tienda_path):
+    subida = reclamar_subida(subida_id, "imagen")
+    ruta = subidas.ruta_parcial(current_app.config['SUBIDAS_DIR'], subida.id)
+    return imagenes.mover_imagen(ruta, subida.sha256, subida.nombre, tienda_path)
+
+def usar_catalogo_subida(subida_id, tienda_path):
+    subida = reclamar_subida(subida_id, "catalogo")
+    os.makedirs(tienda_path, exist_ok=True)
+    shutil.move(subidas.ruta_parcial(current_app.config['SUBIDAS_DIR'], subida.id), os.path.join(tienda_path, subida.nombre))
+    return subida.nombre
+
+def limpiar_subidas_db(horas):
+    # Borra subidas sin actividad en las últimas horas (las abandonadas a
+    # medias y los registros de las ya usadas) junto con sus parciales
+    limite = datetime.datetime.utcnow() - datetime.timedelta(hours=horas)
+    ids = db.session.scalars(db.select(Subida.id).where(Subida.actualizado < limite)).all()
+    for i in range(0, len(ids), 500):
+        lote = ids[i:i + 500]
+        db.session.execute(db.delete(Subida).where(Subida.id.in_(lote)))
+        db.session.commit()
+        for subida_id in lote:
+            subidas.olvidar_hash(subida_id)
+            subidas.eliminar_parcial(current_app.config['SUBIDAS_DIR'], subida_id)
+    return len(ids)
+
+ultimo_barrido_subidas = [0.0]
+
+def barrer_subidas():
+    # Limpieza oportunista al iniciar subidas, como mucho cada
+    # SUBIDA_BARRIDO_MINUTOS por proceso y en segundo plano
+    ahora = time.monotonic()
+    if ahora - ultimo_barrido_subidas[0] < current_app.config['SUBIDA_BARRIDO_MINUTOS'] * 60:
+        return
+    ultimo_barrido_subidas[0] = ahora
+    en_segundo_plano(limpiar_subidas_caducadas)
+
+def limpiar_subidas_caducadas():
+    try:
+        borradas = transaccion(lambda: limpiar_subidas_db(current_app.config['SUBIDA_EXPIRA_HORAS']))
+        if borradas:
+            print(f"🧹 Subidas caducadas eliminadas: {borradas}")
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Error al limpiar subidas:", e)
+
+# --- Archivos subidos ---
+
+@bp.route('/uploads/<slug>/<filename>')
+def serve_upload(slug, filename):
+    # El directorio es el slug tal cual (así se guarda, también con tildes o
+    # ñ); safe_join y send_from_directory impiden salir de uploads/
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], slug)
+    if path is None:
+        abort(404)
+    if not imagenes.es_nombre_hash(filename) or not os.path.isdir(path):
+        return send_from_directory(path, filename)
+
+    # Nombres por hash: el contenido de la URL no cambia nunca
+    servido = filename
+    if not os.path.exists(os.path.join(path, filename)):
+        servido = imagenes.resolver_variante(path, filename)
+    if servido != filename:
+        # Variante sustituida por el original: no la marcamos como immutable
+        return send_from_directory(path, servido)
+    resp = send_from_directory(path, filename, max_age=UN_ANO)
+    resp.headers['Cache-Control'] = f"public, max-age={UN_ANO}, immutable"
+    return resp
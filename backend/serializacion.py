@@ -0,0 +1,85 @@
+# ───── SERIALIZACIÓN Y COMPRESIÓN ─────
+# Codificación de respuestas grandes (listados de productos): JSON con orjson
+# si está instalado (varias veces más rápido que json), MessagePack si el
+# cliente lo pide en Accept y msgpack está instalado, y compresión gzip o
+# brotli según Accept-Encoding. Todo opcional: sin esas librerías se usa json
+# y gzip de la biblioteca estándar.
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIMETYPE_JSON = 'application/json'
+MIMETYPE_MSGPACK = 'application/msgpack'
+# Tipos que vale la pena comprimir (las imágenes ya vienen comprimidas)
+COMPRIMIBLES = ('application/json', 'application/msgpack', 'application/x-ndjson', 'text/')
+
+def formatos_disponibles():
+    return [MIMETYPE_JSON] + ([MIMETYPE_MSGPACK] if msgpack else [])
+
+def negociar(accept):
+    # accept: request.accept_mimetypes. Ante empate (o */*) gana JSON.
+    return accept.best_match(formatos_disponibles(), default=MIMETYPE_JSON) or MIMETYPE_JSON
+
+def a_json(datos):
+    # bytes UTF-8
+    if orjson:
+        return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def codificar(datos, mimetype):
+    if mimetype == MIMETYPE_MSGPACK:
+        return msgpack.packb(datos, use_bin_type=True)
+    return a_json(datos)
+
+# ───── COMPRESIÓN ─────
+
+def elegir_codificacion(accept_encodings):
+    # accept_encodings: request.accept_encodings. brotli comprime más que
+    # gzip a igual coste en texto; se usa si el cliente y el servidor pueden.
+    if brotli and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def es_comprimible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRIMIBLES)
+
+def _compresor(codificacion, nivel_gzip):
+    if codificacion == 'br':
+        c = brotli.Compressor(quality=5)
+        return c.process, c.finish
+    c = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31) # 31: cabecera gzip
+    return c.compress, c.flush
+
+def comprimir(cuerpo, codificacion, nivel_gzip=6):
+    comprimir_trozo, terminar = _compresor(codificacion, nivel_gzip)
+    return comprimir_trozo(cuerpo) + terminar()
+
+def comprimir_flujo(trozos, codificacion, nivel_gzip=6):
+    # Para respuestas en streaming: comprime trozo a trozo sin juntar el cuerpo
+    comprimir_trozo, terminar = _compresor(codificacion, nivel_gzip)
+    try:
+        for trozo in trozos:
+            if isinstance(trozo, str):
+                trozo = trozo.encode('utf-8')
+            salida = comprimir_trozo(trozo)
+            if salida:
+                yield salida
+        yield terminar()
+    finally:
+        cerrar = getattr(trozos, 'close', None)
+        if cerrar:
+            cerrar()
@@ -0,0 +1,37 @@
+# ───── SERVICIOS DE LA APP ─────
+# Objetos en memoria que viven lo mismo que la app: caché de respuestas,
+# métricas y el ejecutor de tareas en segundo plano (ingestas, relacionados,
+# limpieza de subidas). create_app() los crea con la configuración de la app y
+# los guarda en app.extensions; las vistas y los trabajos los obtienen con
+# actuales(), que necesita un contexto de app.
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from cache import CacheRespuestas
+from metricas import Metricas
+
+CLAVE = 'paratodos'
+
+class Servicios:
+    def __init__(self, config):
+        self.cache_respuestas = CacheRespuestas(
+            max_entradas=config['CACHE_RESPUESTAS_MAX'], ttl=config['CACHE_RESPUESTAS_TTL']
+        )
+        self.metricas = Metricas(
+            sql_lenta_ms=config['METRICAS_SQL_LENTA_MS'], umbral_n_mas_1=config['METRICAS_N_MAS_1']
+        )
+        # Los hilos se crean con la primera tarea, no al arrancar
+        self.ejecutor = ThreadPoolExecutor(max_workers=config['INGESTA_WORKERS'], thread_name_prefix='ingesta')
+        self.buffer_leads = None # lo crea el blueprint de leads
+        self.ingestas_reanudadas = False
+
+def actuales():
+    return current_app.extensions[CLAVE]
+
+def en_segundo_plano(fn, *args):
+    # Ejecuta fn(*args) en el ejecutor, dentro de un contexto de esta app
+    app = current_app._get_current_object()
+
+    def tarea():
+        with app.app_context():
+            return fn(*args)
+    return actuales().ejecutor.submit(tarea)
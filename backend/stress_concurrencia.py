@@ -0,0 +1,135 @@
+# ───── PRUEBA DE ESTRÉS MULTIPROCESO ─────
+# Simula varios workers (como gunicorn) escribiendo a la vez sobre el mismo
+# archivo SQLite: cada proceso importa la app por su cuenta, registra leads y
+# edita productos. Al final se comprueba que no se perdió ningún lead (ni en
+# Lead ni en el rollup lead_diario) y que la última edición de cada proceso es
+# la que quedó guardada.
+#
+#   python stress_concurrencia.py --procesos 8 --leads 500 --ediciones 50
+#   python stress_concurrencia.py --modo desarrollo   # sin WAL, para comparar
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+SLUG = "stress"
+
+def _preparar_entorno(directorio, modo):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directorio, 'stress.db')
+    os.environ['DB_MODO'] = modo
+    os.environ['INGESTA_WORKERS'] = '1'
+    os.chdir(directorio)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def sembrar(directorio, modo, procesos):
+    _preparar_entorno(directorio, modo)
+    import app as m
+    from modelos import db, preparar_esquema, Tienda, Producto
+    with m.app.app_context():
+        preparar_esquema()
+        tienda = Tienda(nombre="Stress", slug=SLUG, telefono="0")
+        db.session.add(tienda)
+        db.session.flush()
+        productos = [Producto(nombre=f"producto {i}", precio="1", tienda_id=tienda.id) for i in range(procesos + 1)]
+        db.session.add_all(productos)
+        db.session.commit()
+        return tienda.id, [p.id for p in productos]
+
+def trabajador(indice, directorio, modo, tienda_id, producto_ids, leads, ediciones, resultados):
+    _preparar_entorno(directorio, modo)
+    import app as m
+    from servicios import CLAVE
+    cliente = m.app.test_client()
+    propio, compartido = producto_ids[indice], producto_ids[-1]
+    fallos, ultima_edicion = [], None
+    cada = max(1, leads // max(1, ediciones))
+
+    inicio = time.perf_counter()
+    for i in range(leads):
+        producto_id = producto_ids[(indice + i) % len(producto_ids)]
+        r = cliente.post('/api/leads', json={"producto_id": producto_id, "tienda_id": tienda_id})
+        if r.status_code not in (201, 202):
+            fallos.append(f"lead {i}: {r.status_code} {r.get_data(as_text=True)[:200]}")
+        if i % cada == 0:
+            for destino in (propio, compartido):
+                nombre = f"p{indice}-e{i}"
+                r = cliente.put(f'/api/producto/{destino}', data={
+                    "nombre": nombre, "descripcion": "stress", "precio": str(i), "slug": SLUG
+                })
+                if r.status_code != 200:
+                    fallos.append(f"edición {destino}: {r.status_code} {r.get_data(as_text=True)[:200]}")
+                elif destino == propio:
+                    ultima_edicion = nombre
+    m.app.extensions[CLAVE].buffer_leads.detener() # vacía lo pendiente antes de salir
+    resultados.put({
+        "indice": indice,
+        "segundos": time.perf_counter() - inicio,
+        "fallos": fallos,
+        "ultima_edicion": ultima_edicion,
+        "producto": propio,
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés multiproceso sobre SQLite")
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--leads', type=int, default=300, help="leads por proceso")
+    parser.add_argument('--ediciones', type=int, default=30, help="ediciones por proceso")
+    parser.add_argument('--modo', default='produccion', choices=['produccion', 'desarrollo'])
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='paratodos-stress-')
+    ctx = multiprocessing.get_context('spawn') # cada proceso importa la app desde cero
+    with ctx.Pool(1) as pool:
+        tienda_id, producto_ids = pool.apply(sembrar, (directorio, args.modo, args.procesos))
+
+    resultados = ctx.Queue()
+    procesos = [
+        ctx.Process(target=trabajador, args=(
+            i, directorio, args.modo, tienda_id, producto_ids, args.leads, args.ediciones, resultados
+        ))
+        for i in range(args.procesos)
+    ]
+    inicio = time.perf_counter()
+    for p in procesos:
+        p.start()
+    informes = [resultados.get() for _ in procesos]
+    for p in procesos:
+        p.join()
+    total_segundos = time.perf_counter() - inicio
+
+    _preparar_entorno(directorio, args.modo)
+    import app as m
+    from modelos import db, Lead, LeadDiario, Producto
+    with m.app.app_context():
+        leads = db.session.query(Lead).count()
+        rollup = db.session.query(db.func.coalesce(db.func.sum(LeadDiario.total), 0)).scalar()
+        nombres = dict(db.session.query(Producto.id, Producto.nombre).all())
+
+    esperados = args.procesos * args.leads
+    errores = []
+    for informe in informes:
+        errores.extend(f"proceso {informe['indice']}: {f}" for f in informe["fallos"])
+        if nombres.get(informe["producto"]) != informe["ultima_edicion"]:
+            errores.append(
+                f"proceso {informe['indice']}: producto {informe['producto']} quedó como "
+                f"{nombres.get(informe['producto'])!r}, se esperaba {informe['ultima_edicion']!r}"
+            )
+    if leads != esperados:
+        errores.append(f"leads guardados {leads}, esperados {esperados}")
+    if rollup != esperados:
+        errores.append(f"rollup lead_diario {rollup}, esperados {esperados}")
+
+    print(f"modo={args.modo} procesos={args.procesos} leads={esperados} "
+          f"tiempo={total_segundos:.2f}s ({esperados / total_segundos:.0f} leads/s)")
+    print(f"base de datos: {os.path.join(directorio, 'stress.db')}")
+    if errores:
+        print(f"❌ {len(errores)} problemas:")
+        for e in errores[:20]:
+            print("  -", e)
+        sys.exit(1)
+    print("✅ Sin leads ni ediciones perdidas")
+
+if __name__ == '__main__':
+    main()
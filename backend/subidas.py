@@ -0,0 +1,187 @@
+# ───── SUBIDAS POR TROZOS ─────
+# Subidas reanudables de catálogos e imágenes: el cliente inicia la subida
+# (tipo, nombre y tamaño), envía trozos con PUT indicando el offset y la
+# finaliza. Cada trozo se recibe por bloques en un temporal propio de la
+# petición, así que la memoria por subida no depende del tamaño del archivo.
+# Sólo después de reclamar su offset en la base (un UPDATE condicionado a los
+# bytes confirmados) se copia al archivo parcial: de dos peticiones con el
+# mismo offset (un reintento, un trozo repetido) escribe una sola, y nunca
+# sobre bytes ya confirmados. Si la conexión se corta, el cliente pregunta
+# cuántos bytes llegaron y sigue desde ahí.
+#
+# El SHA-256 se calcula mientras llegan los trozos. El estado del hash vive en
+# memoria del proceso (no se puede guardar en la base); si la subida se
+# reanuda en otro worker o tras un reinicio, se recalcula leyendo el parcial
+# al finalizar. El registro de cada subida (offset, estado) está en la tabla
+# subida (modelos.py) y lo actualiza rutas/subidas.py.
+import os
+import re
+import glob
+import uuid
+import shutil
+import hashlib
+import threading
+from werkzeug.exceptions import RequestEntityTooLarge
+import imagenes
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Extensiones aceptadas y firma (primeros bytes) de cada tipo de subida. Las
+# imágenes se validan además con Pillow al usarlas (ver imagenes.py).
+TIPOS = {
+    'catalogo': { 'extensiones': { 'pdf' }, 'firmas': (b'%PDF-',) },
+    'imagen': {
+        'extensiones': imagenes.EXTENSIONES,
+        'firmas': (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'RIFF', b'BM'),
+    },
+}
+PATRON_ID = re.compile(r'^[0-9a-f]{32}$')
+PATRON_RANGO = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+class TrozoDemasiadoGrande(Exception):
+    pass
+
+def extension(nombre):
+    return os.path.splitext(nombre or '')[1].lower().lstrip('.')
+
+def validar_inicio(tipo, nombre, tamano, maximo):
+    # Lanza ValueError si la subida no se puede aceptar
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo debe ser uno de: {', '.join(TIPOS)}")
+    if extension(nombre) not in TIPOS[tipo]['extensiones']:
+        raise ValueError("Extensión de archivo no permitida")
+    if isinstance(tamano, bool) or not isinstance(tamano, int) or tamano <= 0:
+        raise ValueError("tamano debe ser un entero positivo (bytes)")
+    if tamano > maximo:
+        raise ValueError(f"El archivo supera el máximo de {maximo // (1024 * 1024)} MB")
+
+def leer_offset(args, cabeceras):
+    # ?offset=N o Content-Range: bytes N-M/TOTAL. None si no viene ninguno.
+    if args.get('offset') is not None:
+        try:
+            return int(args['offset'])
+        except ValueError:
+            raise ValueError("offset debe ser un entero")
+    rango = cabeceras.get('Content-Range')
+    if rango:
+        m = PATRON_RANGO.match(rango.strip())
+        if not m:
+            raise ValueError("Content-Range no válido")
+        return int(m.group(1))
+    return None
+
+def ruta_parcial(directorio, subida_id):
+    return os.path.join(directorio, f"{subida_id}.parte")
+
+def crear_parcial(directorio, subida_id):
+    os.makedirs(directorio, exist_ok=True)
+    open(ruta_parcial(directorio, subida_id), 'wb').close()
+
+def eliminar_parcial(directorio, subida_id):
+    # También los temporales de trozos que quedaron de un proceso caído
+    for ruta in [ruta_parcial(directorio, subida_id)] + glob.glob(os.path.join(directorio, f"{subida_id}.*.trozo")):
+        descartar_trozo(ruta)
+
+def vaciar_parcial(directorio, subida_id):
+    with open(ruta_parcial(directorio, subida_id), 'r+b') as f:
+        f.truncate(0)
+
+def tamano_parcial(directorio, subida_id):
+    return os.path.getsize(ruta_parcial(directorio, subida_id))
+
+# ── Hash incremental ──
+
+_hashes = {} # subida_id -> (offset hasta el que se ha hasheado, hasher)
+_lock = threading.Lock()
+
+def _tomar_hash(subida_id, offset):
+    # El hasher sólo sirve si cubre exactamente los bytes ya recibidos
+    with _lock:
+        actual = _hashes.pop(subida_id, None)
+    if actual and actual[0] == offset:
+        return actual[1]
+    if offset == 0:
+        return hashlib.sha256()
+    return None
+
+def guardar_hash(subida_id, offset, hasher):
+    if hasher is None:
+        return
+    with _lock:
+        _hashes[subida_id] = (offset, hasher)
+
+def olvidar_hash(subida_id):
+    with _lock:
+        _hashes.pop(subida_id, None)
+
+def recibir_trozo(directorio, subida_id, offset, flujo, maximo):
+    # Copia el flujo a un temporal de esta petición, por bloques. Devuelve
+    # (ruta del temporal, bytes recibidos, hasher o None, completo). Si el
+    # cliente corta la conexión a mitad, lo recibido hasta ahí cuenta
+    # (completo=False) y se reanuda desde ese punto. Lanza
+    # TrozoDemasiadoGrande si el trozo pasa de maximo. El parcial no se toca:
+    # eso lo hace aplicar_trozo una vez reclamado el offset.
+    hasher = _tomar_hash(subida_id, offset)
+    ruta = os.path.join(directorio, f"{subida_id}.{uuid.uuid4().hex}.trozo")
+    escritos, completo = 0, True
+    try:
+        with open(ruta, 'wb') as destino:
+            while True:
+                try:
+                    bloque = flujo.read(TAMANO_BLOQUE)
+                except RequestEntityTooLarge:
+                    # Cuerpo sin Content-Length que pasa de request.max_content_length
+                    raise TrozoDemasiadoGrande()
+                except Exception:
+                    completo = False
+                    break
+                if not bloque:
+                    break
+                if escritos + len(bloque) > maximo:
+                    raise TrozoDemasiadoGrande()
+                destino.write(bloque)
+                if hasher is not None:
+                    hasher.update(bloque)
+                escritos += len(bloque)
+    except BaseException:
+        descartar_trozo(ruta)
+        raise
+    return ruta, escritos, hasher, completo
+
+def aplicar_trozo(directorio, subida_id, offset, ruta):
+    # Copia el trozo recibido al parcial en su offset y borra el temporal.
+    # Sólo debe llamarlo la petición que reclamó ese offset.
+    try:
+        with open(ruta, 'rb') as origen, open(ruta_parcial(directorio, subida_id), 'r+b') as destino:
+            destino.seek(offset)
+            shutil.copyfileobj(origen, destino, TAMANO_BLOQUE)
+    finally:
+        descartar_trozo(ruta)
+
+def descartar_trozo(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+def sha256(directorio, subida_id, offset):
+    # Hash del archivo completo: el incremental si lo tiene este proceso, si
+    # no se lee el parcial de disco
+    with _lock:
+        actual = _hashes.pop(subida_id, None)
+    if actual and actual[0] == offset:
+        return actual[1].hexdigest()
+    h = hashlib.sha256()
+    with open(ruta_parcial(directorio, subida_id), 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def validar_contenido(directorio, subida_id, tipo):
+    # Comprueba la firma del archivo; lanza ValueError si no coincide con el tipo
+    with open(ruta_parcial(directorio, subida_id), 'rb') as f:
+        cabecera = f.read(16)
+    if not cabecera.startswith(TIPOS[tipo]['firmas']):
+        raise ValueError("El contenido no corresponde al tipo de archivo")
+    if cabecera.startswith(b'RIFF') and cabecera[8:12] != b'WEBP':
+        raise ValueError("El contenido no corresponde al tipo de archivo")
@@ -0,0 +1,57 @@
+# Fixtures comunes: una app por prueba con su propia base SQLite y carpetas
+# en tmp_path. Desde backend/: python -m pytest
+import json
+import pytest
+from app import create_app
+from modelos import db, preparar_esquema, Tienda
+from servicios import CLAVE
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'prueba.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'SUBIDAS_DIR': str(tmp_path / 'subidas'),
+        'INGESTA_CACHE_DIR': str(tmp_path / 'cache_ingesta'),
+        'LEADS_BUFFER': False,
+    })
+    with app.app_context():
+        preparar_esquema()
+    yield app
+    app.extensions[CLAVE].ejecutor.shutdown(wait=True)
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+def esperar_tareas(app):
+    # Espera a que terminen las tareas en segundo plano ya encoladas
+    app.extensions[CLAVE].ejecutor.shutdown(wait=True)
+
+@pytest.fixture
+def tienda(app):
+    with app.app_context():
+        nueva = Tienda(nombre="Tienda Prueba", slug="tienda-prueba", telefono="584120000000")
+        db.session.add(nueva)
+        db.session.commit()
+        return { "id": nueva.id, "slug": nueva.slug }
+
+class ClienteIAFalso:
+    # Sustituto del cliente de OpenAI (app.config['INGESTA_CLIENTE_IA'] o
+    # extraer_productos): responder(texto) devuelve la lista de productos del
+    # chunk, o lanza una excepción para simular un fallo del modelo
+    def __init__(self, responder):
+        self.responder = responder
+        self.llamadas = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages):
+        texto = messages[-1]["content"]
+        self.llamadas.append(texto)
+        contenido = json.dumps(self.responder(texto))
+        mensaje = type("Mensaje", (), { "content": contenido })
+        return type("Respuesta", (), { "choices": [type("Opcion", (), { "message": mensaje })] })
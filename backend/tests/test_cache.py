@@ -0,0 +1,117 @@
+import time
+from cache import CacheRespuestas
+from modelos import db, Tienda, Producto
+from servicios import CLAVE
+
+# ── CacheRespuestas ──
+
+def guardar(cache, clave, etiquetas=("t",)):
+    return cache.guardar(clave, clave.encode(), "application/json", etiquetas, cache.version(etiquetas))
+
+def test_lru_descarta_la_menos_usada():
+    cache = CacheRespuestas(max_entradas=2)
+    guardar(cache, "a")
+    guardar(cache, "b")
+    cache.obtener("a")
+    guardar(cache, "c")
+    assert cache.obtener("b") is None
+    assert cache.obtener("a").cuerpo == b"a"
+    assert len(cache) == 2
+
+def test_ttl():
+    cache = CacheRespuestas(ttl=0.05)
+    guardar(cache, "a")
+    assert cache.obtener("a") is not None
+    time.sleep(0.06)
+    assert cache.obtener("a") is None
+
+def test_invalidar_por_etiqueta():
+    cache = CacheRespuestas()
+    guardar(cache, "lola", ("tienda:lola",))
+    guardar(cache, "pepe", ("tienda:pepe",))
+    guardar(cache, "lista", ("tiendas", "tienda:lola"))
+    cache.invalidar("tienda:lola")
+    assert cache.obtener("lola") is None and cache.obtener("lista") is None
+    assert cache.obtener("pepe") is not None
+
+def test_no_guarda_una_respuesta_ya_invalidada():
+    # La respuesta se generó antes de una invalidación: no debe quedar en caché
+    cache = CacheRespuestas()
+    version = cache.version(("tienda:lola",))
+    cache.invalidar("tienda:lola")
+    entrada = cache.guardar("lola", b"viejo", "application/json", ("tienda:lola",), version)
+    assert entrada.cuerpo == b"viejo"
+    assert cache.obtener("lola") is None
+
+def test_etag_depende_del_cuerpo():
+    cache = CacheRespuestas()
+    assert guardar(cache, "a").etag == guardar(cache, "a").etag
+    assert guardar(cache, "a").etag != guardar(cache, "b").etag
+
+# ── Endpoints ──
+
+def crear_tiendas(app):
+    with app.app_context():
+        ids = {}
+        for slug in ("lola", "pepe"):
+            tienda = Tienda(nombre=slug.title(), slug=slug)
+            db.session.add(tienda)
+            db.session.flush()
+            producto = Producto(nombre=f"Falda {slug}", descripcion="", precio="10$", tienda_id=tienda.id)
+            db.session.add(producto)
+            db.session.flush()
+            ids[slug] = producto.id
+        db.session.commit()
+        return ids
+
+def test_etag_y_304(app, cliente):
+    crear_tiendas(app)
+    r = cliente.get("/api/productos/lola")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert "must-revalidate" in r.headers["Cache-Control"]
+
+    r = cliente.get("/api/productos/lola", headers={ "If-None-Match": etag })
+    assert r.status_code == 304
+    assert r.data == b""
+    assert cliente.get("/api/productos/lola", headers={ "If-None-Match": '"otro"' }).status_code == 200
+
+def test_editar_invalida_solo_su_tienda(app, cliente):
+    ids = crear_tiendas(app)
+    etag_lola = cliente.get("/api/productos/lola").headers["ETag"]
+    etag_pepe = cliente.get("/api/productos/pepe").headers["ETag"]
+    cache = app.extensions[CLAVE].cache_respuestas
+    assert len(cache) == 2
+
+    # Aunque el formulario traiga el slug de otra tienda, se invalida la del producto
+    r = cliente.put(f"/api/producto/{ids['lola']}", data={
+        "slug": "pepe", "nombre": "Falda larga", "descripcion": "", "precio": "12$"
+    })
+    assert r.status_code == 200
+    assert len(cache) == 1
+
+    r = cliente.get("/api/productos/lola", headers={ "If-None-Match": etag_lola })
+    assert r.status_code == 200
+    assert r.get_json()["productos"][0]["nombre"] == "Falda larga"
+    assert r.headers["ETag"] != etag_lola
+    assert cliente.get("/api/productos/pepe", headers={ "If-None-Match": etag_pepe }).status_code == 304
+
+def test_crear_producto_invalida_la_tienda(app, cliente):
+    crear_tiendas(app)
+    assert len(cliente.get("/api/productos/lola").get_json()["productos"]) == 1
+    r = cliente.post("/api/crear-producto", data={
+        "slug": "lola", "nombre": "Bolso", "descripcion": "", "precio": "20$"
+    })
+    assert r.status_code == 200, r.get_json()
+    assert len(cliente.get("/api/productos/lola").get_json()["productos"]) == 2
+
+def test_etag_por_codificacion(app, cliente):
+    crear_tiendas(app)
+    app.config['COMPRESION_MIN_BYTES'] = 1
+    plano = cliente.get("/api/productos/lola", headers={ "Accept-Encoding": "identity" })
+    gzip = cliente.get("/api/productos/lola", headers={ "Accept-Encoding": "gzip" })
+    assert gzip.headers["Content-Encoding"] == "gzip"
+    assert gzip.headers["ETag"] != plano.headers["ETag"]
+    assert "Accept-Encoding" in gzip.headers["Vary"]
+    r = cliente.get("/api/productos/lola", headers={ "Accept-Encoding": "gzip", "If-None-Match": gzip.headers["ETag"] })
+    assert r.status_code == 304
@@ -0,0 +1,43 @@
+import io
+import sqlite3
+from modelos import db, Producto
+from rutas.productos import TAMANO_LOTE_IMPORTACION
+
+def importar(cliente, tienda, cuerpo, **kwargs):
+    return cliente.post(f"/api/tienda/{tienda['slug']}/productos/import?modo=upsert",
+                        content_type="text/csv", data=cuerpo, **kwargs)
+
+def test_upsert_cuenta_productos_escritos(app, cliente, tienda):
+    cuerpo = "nombre,precio\nFalda,10$\nFalda,12$\nBolso,5$\n"
+    r = importar(cliente, tienda, cuerpo)
+    assert (r.get_json()["insertados"], r.get_json()["actualizados"]) == (2, 0)
+    with app.app_context():
+        assert dict(db.session.execute(db.select(Producto.nombre, Producto.precio_valor)).all()) == { "Falda": 12.0, "Bolso": 5.0 }
+
+    r = importar(cliente, tienda, cuerpo)
+    assert (r.get_json()["insertados"], r.get_json()["actualizados"]) == (0, 2)
+
+class CuerpoVigilado(io.BytesIO):
+    # Mientras el servidor lee el cuerpo, otra conexión intenta escribir sin esperar
+    def __init__(self, contenido, ruta_db):
+        super().__init__(contenido)
+        self.ruta_db, self.bloqueos = ruta_db, 0
+
+    def readinto(self, destino):
+        conexion = sqlite3.connect(self.ruta_db, timeout=0)
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self.bloqueos += 1
+        finally:
+            conexion.close()
+        return super().readinto(memoryview(destino)[:4096])
+
+def test_la_importacion_no_bloquea_la_base_mientras_lee(app, cliente, tienda):
+    filas = ["nombre,precio"] + [f"Producto {n},{n}$" for n in range(TAMANO_LOTE_IMPORTACION * 3)]
+    ruta_db = app.config['SQLALCHEMY_DATABASE_URI'].removeprefix("sqlite:///")
+    cuerpo = CuerpoVigilado("\n".join(filas).encode(), ruta_db)
+    r = importar(cliente, tienda, None, input_stream=cuerpo)
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["insertados"] == TAMANO_LOTE_IMPORTACION * 3
+    assert cuerpo.bloqueos == 0
@@ -0,0 +1,90 @@
+import re
+import pytest
+from conftest import ClienteIAFalso
+import ingesta
+
+def productos_del_texto(texto):
+    # Cada línea "Nombre: precio" del chunk es un producto
+    return [
+        { "name": nombre.strip(), "description": "", "price": precio.strip() }
+        for nombre, precio in re.findall(r"^([^:\n]+):([^\n]*)$", texto, re.M)
+    ]
+
+def test_chunks_respetan_el_limite_y_las_paginas():
+    paginas = ["a" * 400, "b" * 400, "c" * 400, "", "d" * 100]
+    chunks = ingesta.dividir_en_chunks(paginas, max_tokens=200)
+    assert chunks == ["a" * 400 + "\n" + "b" * 400, "c" * 400 + "\n" + "d" * 100]
+
+def test_pagina_larga_se_parte_por_lineas():
+    pagina = "\n".join(f"Producto {n}: {n}$" for n in range(300))
+    chunks = ingesta.dividir_en_chunks([pagina], max_tokens=100)
+    assert len(chunks) > 1
+    assert all(ingesta.estimar_tokens(c) <= 100 for c in chunks)
+    assert "".join(chunks) == pagina
+
+def test_fusion_deduplica_entre_chunks():
+    productos = ingesta.fusionar_productos([
+        [{ "name": "Camisa Lino", "price": "" }, { "name": "Gorra", "price": "5$" }],
+        [{ "name": "camisa  lino", "price": "20$", "description": "Blanca" }, { "name": "Gorra", "price": "7$" }],
+        [{ "name": "Cámisa lino", "price": "20$" }, { "name": "" }],
+    ])
+    assert productos == [
+        { "name": "Camisa Lino", "price": "20$", "description": "Blanca" },
+        { "name": "Gorra", "price": "5$" },
+        { "name": "Gorra", "price": "7$" },
+    ]
+
+def test_respuesta_con_bloque_de_codigo():
+    contenido = 'Aquí está:\n```json\n[{"name": "Falda", "price": "9$"}]\n```'
+    assert ingesta._parsear_respuesta(contenido) == [{ "name": "Falda", "price": "9$" }]
+    assert ingesta._parsear_respuesta('{"products": [{"name": "Bolso"}, 3]}') == [{ "name": "Bolso" }]
+
+def test_cache_de_chunks(tmp_path):
+    cache = ingesta.CacheIngesta(str(tmp_path))
+    paginas = [f"Producto {n}: {n}$\n" + "x" * 300 for n in range(6)]
+    cliente = ClienteIAFalso(productos_del_texto)
+
+    productos, errores = ingesta.extraer_productos(paginas, cliente, cache=cache, max_tokens=100)
+    assert [p["name"] for p in productos] == [f"Producto {n}" for n in range(6)]
+    assert not errores
+    llamadas = len(cliente.llamadas)
+    assert llamadas == len(ingesta.dividir_en_chunks(paginas, 100))
+
+    # El mismo catálogo sale entero de la caché
+    assert ingesta.extraer_productos(paginas, cliente, cache=cache, max_tokens=100)[0] == productos
+    assert len(cliente.llamadas) == llamadas
+
+    # Cambiar una página sólo vuelve a pedir su chunk
+    paginas[2] = paginas[2].replace("Producto 2: 2$", "Producto 2: 3$")
+    productos, _ = ingesta.extraer_productos(paginas, cliente, cache=cache, max_tokens=100)
+    assert len(cliente.llamadas) == llamadas + 1
+    assert productos[2]["price"] == "3$"
+
+def test_cache_de_paginas(tmp_path):
+    cache = ingesta.CacheIngesta(str(tmp_path / "cache"))
+    pdf = tmp_path / "catalogo.pdf"
+    pdf.write_bytes(b"%PDF-1.4 no es un PDF de verdad")
+    cache.guardar("paginas", ingesta.sha256_archivo(str(pdf)), ["Página 1", "Página 2"])
+    progreso = []
+    # Con la caché no hace falta leer el PDF (que además no se podría)
+    paginas = ingesta.extraer_paginas(str(pdf), lambda hechas, total: progreso.append((hechas, total)), cache=cache)
+    assert paginas == ["Página 1", "Página 2"]
+    assert progreso == [(2, 2)]
+
+def test_un_chunk_fallido_no_tumba_la_ingesta():
+    paginas = ["Falda: 9$\n" + "x" * 300, "ROMPER\n" + "x" * 300, "Bolso: 15$\n" + "x" * 300]
+
+    def responder(texto):
+        if "ROMPER" in texto:
+            raise RuntimeError("timeout del modelo")
+        return productos_del_texto(texto)
+
+    productos, errores = ingesta.extraer_productos(paginas, ClienteIAFalso(responder), max_tokens=100)
+    assert [p["name"] for p in productos] == ["Falda", "Bolso"]
+    assert errores == ["chunk 2/3: timeout del modelo"]
+
+def test_si_fallan_todos_los_chunks_se_relanza():
+    def responder(texto):
+        raise RuntimeError("sin cuota")
+    with pytest.raises(RuntimeError, match="sin cuota"):
+        ingesta.extraer_productos(["Falda: 9$"], ClienteIAFalso(responder))
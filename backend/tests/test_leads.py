@@ -0,0 +1,109 @@
+import os
+import time
+import pytest
+from leads import BufferLeads
+
+class Base:
+    # guardar(lote) de prueba: falla con los leads marcados como malos y,
+    # si se le pide, con un lock las primeras veces
+    def __init__(self, locks=0):
+        self.guardados, self.descartados, self.intentos, self.locks = [], [], 0, locks
+
+    def guardar(self, lote):
+        self.intentos += 1
+        if self.locks:
+            self.locks -= 1
+            raise TimeoutError("database is locked")
+        if any(lead.get("malo") for lead in lote):
+            raise ValueError("fila inválida")
+        self.guardados.extend(lote)
+
+    def buffer(self, **opciones):
+        return BufferLeads(
+            self.guardar, intervalo=0.01, max_lote=10,
+            reintentable=lambda e: isinstance(e, TimeoutError),
+            al_descartar=lambda lote, error: self.descartados.extend(lote), **opciones
+        )
+
+def test_un_lead_malo_no_frena_a_los_demas():
+    base = Base()
+    buffer = base.buffer()
+    leads = [{ "n": n, "malo": n == 3 } for n in range(8)]
+    for lead in leads:
+        buffer.agregar(lead)
+    assert buffer.vaciar() == 8
+    assert [l["n"] for l in base.guardados] == [0, 1, 2, 4, 5, 6, 7]
+    assert [l["n"] for l in base.descartados] == [3]
+    assert buffer.pendientes() == 0
+
+def test_los_locks_se_reintentan():
+    base = Base(locks=2)
+    buffer = base.buffer(max_reintentos=5)
+    buffer.agregar({ "n": 1 })
+    assert buffer.vaciar() == 1
+    assert base.guardados == [{ "n": 1 }]
+    assert base.intentos == 3
+    assert not base.descartados
+
+def test_reintentos_acotados():
+    base = Base(locks=100)
+    buffer = base.buffer(max_reintentos=3)
+    buffer.agregar({ "n": 1 })
+    buffer.agregar({ "n": 2 })
+    assert buffer.vaciar() == 2
+    assert base.intentos == 3
+    assert [l["n"] for l in base.descartados] == [1, 2]
+
+def test_con_el_hilo_los_siguientes_se_guardan():
+    base = Base()
+    buffer = base.buffer()
+    buffer.iniciar()
+    try:
+        buffer.agregar({ "n": 0, "malo": True })
+        for n in range(1, 25):
+            buffer.agregar({ "n": n })
+        limite = time.monotonic() + 5
+        while len(base.guardados) < 24 and time.monotonic() < limite:
+            time.sleep(0.01)
+    finally:
+        buffer.detener()
+    assert len(base.guardados) == 24
+    assert [l["n"] for l in base.descartados] == [0]
+
+def test_agregar_no_bloquea_con_el_buffer_lleno():
+    buffer = Base().buffer(max_pendientes=2, espera_max=0.05)
+    assert buffer.agregar({ "n": 1 }) and buffer.agregar({ "n": 2 })
+    inicio = time.monotonic()
+    assert buffer.agregar({ "n": 3 }) is False
+    assert time.monotonic() - inicio < 1
+    assert buffer.pendientes() == 2
+
+def esperar(condicion, segundos=5):
+    limite = time.monotonic() + segundos
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="sin fork")
+def test_el_hilo_arranca_en_cada_proceso():
+    # Como con gunicorn --preload: el buffer se crea antes del fork y el hilo
+    # del proceso padre no existe en el hijo
+    base = Base()
+    buffer = base.buffer(automatico=True)
+    buffer.agregar({ "n": 0 })
+    esperar(lambda: base.guardados)
+    lectura, escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            buffer.agregar({ "n": 1 })
+            esperar(lambda: len(base.guardados) == 2)
+            os.write(escritura, str(len(base.guardados)).encode())
+        finally:
+            os._exit(0)
+    os.close(escritura)
+    guardados_en_el_hijo = os.read(lectura, 16)
+    os.close(lectura)
+    os.waitpid(pid, 0)
+    buffer.detener()
+    assert guardados_en_el_hijo == b"2"
+    assert base.guardados == [{ "n": 0 }]
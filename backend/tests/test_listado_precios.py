@@ -0,0 +1,69 @@
+import pytest
+from modelos import db, Producto
+from rutas.productos import CAMPOS_PRODUCTO, columnas_producto, consulta_lote_productos
+
+def plan(consulta):
+    sql = str(consulta.compile(dialect=db.engine.dialect, compile_kwargs={ "literal_binds": True }))
+    return [fila[-1] for fila in db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql))]
+
+@pytest.mark.parametrize("orden, cursor, indice", [
+    ("precio", (10.0, 5), "USING INDEX ix_producto_precio"),
+    ("id", 5, "USING INTEGER PRIMARY KEY"),
+])
+def test_el_filtro_de_precio_no_ordena_en_memoria(app, orden, cursor, indice):
+    with app.app_context():
+        columnas = columnas_producto(CAMPOS_PRODUCTO, extra=(Producto.precio_valor,))
+        pasos = plan(consulta_lote_productos(cursor, 50, columnas, min_precio=10, max_precio=20, orden=orden))
+    producto = next(p for p in pasos if " producto " in f" {p} ")
+    assert indice in producto, pasos
+    assert not any("TEMP B-TREE" in p for p in pasos), pasos
+
+def recorrer(cliente, consulta):
+    productos, after = [], ""
+    while True:
+        r = cliente.get(f"/api/productos?limit=3&fields=id,nombre,precio&{consulta}&after={after}")
+        assert r.status_code == 200, r.get_json()
+        cuerpo = r.get_json()
+        productos += cuerpo["productos"]
+        if cuerpo["siguiente"] is None:
+            return productos
+        after = cuerpo["siguiente"]
+
+def test_paginacion_con_filtro_de_precio(app, cliente, tienda):
+    precios = [15, 3, 12, 30, 10, 12, 19, 20, 7, 11]
+    with app.app_context():
+        db.session.add_all(Producto(nombre=f"P{i}", precio=f"${p}", tienda_id=tienda["id"])
+                           for i, p in enumerate(precios))
+        db.session.commit()
+        esperados = db.session.execute(
+            db.select(Producto.id, Producto.precio_valor)
+            .where(Producto.precio_valor.between(10, 20))
+        ).all()
+
+    # Sin ?orden, el filtro de precio recorre por (precio_valor, id)
+    por_precio = recorrer(cliente, "min_precio=10&max_precio=20")
+    assert [p["id"] for p in por_precio] == [i for i, _ in sorted(esperados, key=lambda f: (f[1], f[0]))]
+
+    por_id = recorrer(cliente, "min_precio=10&max_precio=20&orden=id")
+    assert [p["id"] for p in por_id] == sorted(i for i, _ in esperados)
+
+def test_orden_por_precio_omite_productos_sin_precio(app, cliente, tienda):
+    with app.app_context():
+        db.session.add_all([
+            Producto(nombre="Falda", precio="$10", tienda_id=tienda["id"]),
+            Producto(nombre="Gorra", precio="Consultar", tienda_id=tienda["id"]),
+        ])
+        db.session.commit()
+    assert [p["nombre"] for p in recorrer(cliente, "orden=precio")] == ["Falda"]
+    assert [p["nombre"] for p in recorrer(cliente, "orden=id")] == ["Falda", "Gorra"]
+
+@pytest.mark.parametrize("consulta, error", [
+    ("limit=abc", "limit debe ser un número entero"),
+    ("limit=2.5", "limit debe ser un número entero"),
+    ("limit=0", "limit debe ser mayor que 0"),
+    ("min_precio=diez", "min_precio debe ser un número"),
+])
+def test_parametros_invalidos(cliente, consulta, error):
+    r = cliente.get(f"/api/productos?{consulta}")
+    assert r.status_code == 400
+    assert r.get_json()["error"] == error
@@ -0,0 +1,63 @@
+import pytest
+from precios import parsear_precio
+from modelos import db, Producto
+
+@pytest.mark.parametrize("texto, valor", [
+    ("$10", 10.0),
+    ("10$", 10.0),
+    ("$ 10.50", 10.5),
+    ("10$ c/u", 10.0),
+    ("US$ 7", 7.0),
+    ("Bs. 1.234,56", 1234.56),
+    ("Bs.S 2.000.000", 2000000.0),
+    ("VES 50", 50.0),
+    ("1,234.56 USD", 1234.56),
+    ("€12,5", 12.5),
+    ("40 eur", 40.0),
+    ("Ref 25", 25.0),
+    ("25 REF", 25.0),
+    # Separador de miles o decimal según cuántas cifras lo siguen
+    ("1.500", 1500.0),
+    ("12,000", 12000.0),
+    ("0.500", 0.5),
+    ("12.5", 12.5),
+    ("1,50", 1.5),
+    ("1.234.567", 1234567.0),
+    ("12,", 12.0),
+    # El importe junto a la moneda manda sobre otros números del texto
+    ("Modelo X200 - $15", 15.0),
+    ("3x2 a 10$", 10.0),
+    ("15", 15.0),
+    (15, 15.0),
+])
+def test_formatos_de_precio(texto, valor):
+    assert parsear_precio(texto) == valor
+
+@pytest.mark.parametrize("texto", [None, "", "Consultar", "Gratis", "A convenir"])
+def test_sin_importe(texto):
+    assert parsear_precio(texto) is None
+
+def test_redondea_a_centimos():
+    assert parsear_precio("$9.999") == 9999.0
+    assert parsear_precio("9,995 €") == 9995.0
+    # Decimal.quantize: redondeo al par
+    assert parsear_precio("$ 0.125") == 0.12
+    assert parsear_precio("$ 0.135") == 0.14
+
+def test_el_modelo_sincroniza_precio_valor(app, tienda):
+    with app.app_context():
+        producto = Producto(nombre="Falda", precio="Bs. 1.234,56", tienda_id=tienda["id"])
+        db.session.add(producto)
+        db.session.commit()
+        assert producto.precio_valor == 1234.56
+        producto.precio = "Consultar"
+        db.session.commit()
+        assert db.session.get(Producto, producto.id).precio_valor is None
+
+def test_la_importacion_calcula_precio_valor(app, cliente, tienda):
+    cuerpo = "nombre,precio\nFalda,10$ c/u\nBolso,\"1.234,56 Bs\"\nGorra,Consultar\n"
+    r = cliente.post(f"/api/tienda/{tienda['slug']}/productos/import", data=cuerpo, content_type="text/csv")
+    assert r.status_code == 200, r.get_json()
+    with app.app_context():
+        valores = dict(db.session.execute(db.select(Producto.nombre, Producto.precio_valor)).all())
+    assert valores == { "Falda": 10.0, "Bolso": 1234.56, "Gorra": None }
@@ -0,0 +1,47 @@
+import random
+from conftest import esperar_tareas
+from modelos import db
+import recomendaciones
+import trabajos
+
+PALABRAS = """
+    camisa franela pantalon falda vestido zapato sandalia bolso cartera gorra
+    algodon lino seda cuero jean lana azul rojo negro blanco verde estampado
+    liso rayas casual formal deportivo playa invierno verano talla unica
+""".split()
+
+def catalogo_csv(cantidad, semilla=7):
+    azar = random.Random(semilla)
+    lineas = ["nombre,descripcion,precio"]
+    for n in range(cantidad):
+        nombre = " ".join(azar.sample(PALABRAS, 3))
+        descripcion = " ".join(azar.sample(PALABRAS, 6))
+        lineas.append(f"{nombre} {n},{descripcion},{azar.randint(5, 90)}$")
+    return "\n".join(lineas).encode()
+
+def test_importacion_grande_deja_relacionados_en_todos(app, cliente, tienda):
+    cantidad = trabajos.LOTE_RELACIONADOS * 8 + 17
+    r = cliente.post(
+        f"/api/tienda/{tienda['slug']}/productos/import",
+        data=catalogo_csv(cantidad), content_type="text/csv"
+    )
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["insertados"] == cantidad
+    esperar_tareas(app)
+
+    with app.app_context():
+        con_lista = db.session.execute(db.text(
+            f"SELECT count(DISTINCT producto_id) FROM {recomendaciones.TABLA}"
+        )).scalar()
+    assert con_lista == cantidad
+
+def test_relacionados_en_la_ficha(app, cliente, tienda):
+    cliente.post(
+        f"/api/tienda/{tienda['slug']}/productos/import",
+        data=catalogo_csv(trabajos.LOTE_RELACIONADOS + 1), content_type="text/csv"
+    )
+    esperar_tareas(app)
+    for producto_id in (1, trabajos.LOTE_RELACIONADOS + 1):
+        datos = cliente.get(f"/api/producto/{producto_id}").get_json()["producto"]
+        assert datos["relacionados_ids"]
+        assert producto_id not in datos["relacionados_ids"]
@@ -0,0 +1,142 @@
+import io
+import hashlib
+import os
+import sqlite3
+import threading
+import pytest
+import subidas
+
+MB = 1024 * 1024
+
+def pdf(tamano):
+    return (b"%PDF-1.4\n" + os.urandom(tamano))[:tamano]
+
+def iniciar(cliente, contenido, nombre="catalogo.pdf", tipo="catalogo"):
+    r = cliente.post("/api/subidas", json={ "tipo": tipo, "nombre": nombre, "tamano": len(contenido) })
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()["id"]
+
+@pytest.fixture
+def limites(app):
+    # Trozos más grandes que el límite general de las peticiones
+    app.config['MAX_CONTENT_LENGTH'] = 1 * MB
+    app.config['SUBIDA_MAX_TROZO_BYTES'] = 4 * MB
+
+def test_trozo_mayor_que_max_content_length(app, cliente, limites):
+    contenido = pdf(3 * MB)
+    subida_id = iniciar(cliente, contenido)
+    r = cliente.put(f"/api/subidas/{subida_id}?offset=0", data=contenido[:2 * MB])
+    assert r.status_code == 200, r.get_json()
+    r = cliente.put(f"/api/subidas/{subida_id}?offset={2 * MB}", data=contenido[2 * MB:])
+    assert r.get_json()["recibidos"] == len(contenido)
+    r = cliente.post(f"/api/subidas/{subida_id}/finalizar", json={ "sha256": hashlib.sha256(contenido).hexdigest() })
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["subida"]["estado"] == "completa"
+
+def test_trozo_mayor_que_el_maximo(app, cliente, limites):
+    contenido = pdf(6 * MB)
+    subida_id = iniciar(cliente, contenido)
+    r = cliente.put(f"/api/subidas/{subida_id}?offset=0", data=contenido[:5 * MB])
+    assert r.status_code == 413
+    assert "trozo" in r.get_json()["error"]
+    assert cliente.get(f"/api/subidas/{subida_id}").get_json()["subida"]["recibidos"] == 0
+
+def test_importacion_mayor_que_max_content_length(app, cliente, tienda, limites):
+    filas = ["nombre,descripcion,precio"] + [f"Producto {n},{'x' * 4000},{n}$" for n in range(300)]
+    cuerpo = "\n".join(filas).encode()
+    assert len(cuerpo) > MB
+    r = cliente.post(f"/api/tienda/{tienda['slug']}/productos/import", data=cuerpo, content_type="text/csv")
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["insertados"] == 300
+
+def subir(cliente, subida_id, contenido, tamano_trozo):
+    for offset in range(0, len(contenido), tamano_trozo):
+        r = cliente.put(f"/api/subidas/{subida_id}?offset={offset}", data=contenido[offset:offset + tamano_trozo])
+        assert r.status_code == 200, r.get_json()
+
+def test_reintento_en_offset_confirmado_no_recorta(app, cliente):
+    contenido = pdf(3 * MB)
+    subida_id = iniciar(cliente, contenido)
+    subir(cliente, subida_id, contenido[:2 * MB], MB)
+    # Un reintento tardío del primer trozo: ni avanza ni toca el archivo
+    r = cliente.put(f"/api/subidas/{subida_id}?offset=0", data=b"x" * MB)
+    assert r.status_code == 409
+    assert r.get_json()["recibidos"] == 2 * MB
+    parcial = os.path.join(app.config['SUBIDAS_DIR'], f"{subida_id}.parte")
+    assert os.path.getsize(parcial) == 2 * MB
+    assert not [f for f in os.listdir(app.config['SUBIDAS_DIR']) if f.endswith(".trozo")]
+
+    subir_resto = cliente.put(f"/api/subidas/{subida_id}?offset={2 * MB}", data=contenido[2 * MB:])
+    assert subir_resto.status_code == 200
+    r = cliente.post(f"/api/subidas/{subida_id}/finalizar", json={ "sha256": hashlib.sha256(contenido).hexdigest() })
+    assert r.status_code == 200, r.get_json()
+
+class CuerpoLento(io.BytesIO):
+    # Cuerpo de petición que entrega un bloque y espera una señal para seguir
+    def __init__(self, contenido):
+        super().__init__(contenido)
+        self.empezo, self.seguir = threading.Event(), threading.Event()
+
+    def readinto(self, destino):
+        # werkzeug lee el cuerpo con readinto
+        if self.tell():
+            self.seguir.wait(10)
+        leidos = super().readinto(memoryview(destino)[:64 * 1024])
+        self.empezo.set()
+        return leidos
+
+def test_peticiones_concurrentes_en_el_mismo_offset(app, cliente):
+    contenido = pdf(2 * MB)
+    subida_id = iniciar(cliente, contenido)
+    # Una petición lenta en el offset 0 con otros datos; mientras tanto otra
+    # sube y confirma ese mismo tramo y el siguiente
+    lenta = CuerpoLento(b"x" * MB)
+    respuestas = []
+    hilo = threading.Thread(target=lambda: respuestas.append(app.test_client().put(
+        f"/api/subidas/{subida_id}?offset=0", input_stream=lenta
+    )))
+    hilo.start()
+    assert lenta.empezo.wait(10)
+    subir(cliente, subida_id, contenido, MB)
+    lenta.seguir.set()
+    hilo.join(10)
+
+    assert respuestas[0].status_code == 409
+    with open(os.path.join(app.config['SUBIDAS_DIR'], f"{subida_id}.parte"), "rb") as f:
+        assert f.read() == contenido
+    r = cliente.post(f"/api/subidas/{subida_id}/finalizar", json={ "sha256": hashlib.sha256(contenido).hexdigest() })
+    assert r.status_code == 200, r.get_json()
+
+def test_finalizar_comprueba_el_archivo(app, cliente):
+    contenido = pdf(2 * MB)
+    subida_id = iniciar(cliente, contenido)
+    subir(cliente, subida_id, contenido, MB)
+    with open(os.path.join(app.config['SUBIDAS_DIR'], f"{subida_id}.parte"), "r+b") as f:
+        f.truncate(MB)
+    r = cliente.post(f"/api/subidas/{subida_id}/finalizar")
+    assert r.status_code == 409
+    assert r.get_json()["recibidos"] == 0
+    subida = cliente.get(f"/api/subidas/{subida_id}").get_json()["subida"]
+    assert (subida["estado"], subida["recibidos"]) == ("subiendo", 0)
+
+    subir(cliente, subida_id, contenido, MB)
+    r = cliente.post(f"/api/subidas/{subida_id}/finalizar")
+    assert r.get_json()["subida"]["sha256"] == hashlib.sha256(contenido).hexdigest()
+
+def test_fallo_al_escribir_con_otro_trozo_detras_reinicia(app, cliente, monkeypatch):
+    contenido = pdf(2 * MB)
+    subida_id = iniciar(cliente, contenido)
+
+    def aplicar_trozo_con_error(directorio, id, offset, trozo):
+        # Mientras tanto otro trozo reclamó el tramo siguiente
+        ruta_db = app.config['SQLALCHEMY_DATABASE_URI'].removeprefix("sqlite:///")
+        with sqlite3.connect(ruta_db) as conexion:
+            conexion.execute("UPDATE subida SET recibidos = ? WHERE id = ?", (2 * MB, id))
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(subidas, "aplicar_trozo", aplicar_trozo_con_error)
+    r = cliente.put(f"/api/subidas/{subida_id}?offset=0", data=contenido[:MB])
+    assert r.status_code == 500
+    assert r.get_json()["recibidos"] == 0
+    assert cliente.get(f"/api/subidas/{subida_id}").get_json()["subida"]["recibidos"] == 0
+    assert os.path.getsize(os.path.join(app.config['SUBIDAS_DIR'], f"{subida_id}.parte")) == 0
@@ -0,0 +1,127 @@
+import io
+import os
+import time
+import datetime
+import hashlib
+import threading
+from PIL import Image
+from conftest import ClienteIAFalso
+from modelos import db, Tienda, TrabajoIngesta
+import ingesta
+import trabajos
+
+CATALOGO = b"%PDF-1.4 catalogo de prueba"
+PAGINAS = ["Falda: 9$", "Bolso: 15$"]
+
+def productos_del_texto(texto):
+    return [{ "name": linea.split(":")[0], "price": linea.split(":")[1].strip() } for linea in texto.splitlines()]
+
+def preparar_cache(app):
+    # El texto del "PDF" sale de la caché de páginas: no hace falta un PDF real
+    ingesta.CacheIngesta(app.config['INGESTA_CACHE_DIR']).guardar(
+        'paginas', hashlib.sha256(CATALOGO).hexdigest(), PAGINAS
+    )
+
+def crear_tienda(cliente, nombre="Ropa Lola"):
+    logo = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(logo, "PNG")
+    logo.seek(0)
+    r = cliente.post("/api/crear-tienda", data={
+        "nombre": nombre, "responsable": "Lola", "rif": "J-2", "email": "l@o.la",
+        "telefono": "584120000000", "direccion": "Valencia", "productos": "ropa", "color": "#ffffff",
+        "logo": (logo, "logo.png"),
+        "catalogo": (io.BytesIO(CATALOGO), "catalogo.pdf"),
+    }, content_type="multipart/form-data")
+    return r
+
+def estado(cliente, slug):
+    return cliente.get(f"/api/tienda/{slug}/ingesta").get_json()["ingesta"]
+
+def esperar_estado(cliente, slug, estados, segundos=10):
+    limite = time.monotonic() + segundos
+    while True:
+        actual = estado(cliente, slug)
+        if actual["estado"] in estados or time.monotonic() > limite:
+            return actual
+        time.sleep(0.02)
+
+def test_ingesta_pasa_por_ia_y_termina(app, cliente):
+    preparar_cache(app)
+    seguir = threading.Event()
+
+    def responder(texto):
+        seguir.wait(10)
+        return productos_del_texto(texto)
+    app.config['INGESTA_CLIENTE_IA'] = lambda: ClienteIAFalso(responder)
+
+    r = crear_tienda(cliente)
+    assert r.status_code == 202, r.get_json()
+    slug, job_id = r.get_json()["slug"], r.get_json()["job_id"]
+
+    limite = time.monotonic() + 10
+    while estado(cliente, slug)["fase"] != "ia" and time.monotonic() < limite:
+        time.sleep(0.02)
+    en_curso = estado(cliente, slug)
+    assert (en_curso["job_id"], en_curso["estado"], en_curso["fase"]) == (job_id, "procesando", "ia")
+    assert (en_curso["paginas_total"], en_curso["paginas_procesadas"]) == (2, 2)
+    seguir.set()
+
+    final = esperar_estado(cliente, slug, ("completado", "error"))
+    assert (final["estado"], final["fase"], final["error"]) == ("completado", None, None)
+    assert final["productos_creados"] == 2
+    assert final["chunks_total"] == final["chunks_procesados"] == 1
+    nombres = [p["nombre"] for p in cliente.get(f"/api/productos/{slug}").get_json()["productos"]]
+    assert nombres == ["Falda", "Bolso"]
+
+def test_ingesta_fallida_queda_en_error(app, cliente):
+    preparar_cache(app)
+
+    def responder(texto):
+        raise RuntimeError("sin cuota")
+    app.config['INGESTA_CLIENTE_IA'] = lambda: ClienteIAFalso(responder)
+
+    slug = crear_tienda(cliente).get_json()["slug"]
+    final = esperar_estado(cliente, slug, ("completado", "error"))
+    assert final["estado"] == "error"
+    assert "sin cuota" in final["error"]
+    assert final["productos_creados"] == 0
+
+def test_trabajo_pendiente_se_reanuda(app):
+    # Un trabajo que quedó pendiente (p. ej. el servidor se reinició) se
+    # encola con la primera petición de la app
+    preparar_cache(app)
+    app.config['INGESTA_CLIENTE_IA'] = lambda: ClienteIAFalso(productos_del_texto)
+    with app.app_context():
+        tienda = Tienda(nombre="Reinicio", slug="reinicio")
+        db.session.add(tienda)
+        db.session.flush()
+        db.session.add(TrabajoIngesta(tienda_id=tienda.id, archivo="catalogo.pdf"))
+        db.session.commit()
+    destino = os.path.join(app.config['UPLOAD_FOLDER'], "reinicio")
+    os.makedirs(destino)
+    with open(os.path.join(destino, "catalogo.pdf"), "wb") as f:
+        f.write(CATALOGO)
+
+    cliente = app.test_client()
+    assert estado(cliente, "reinicio")["estado"] in ("pendiente", "procesando", "completado")
+    final = esperar_estado(cliente, "reinicio", ("completado", "error"))
+    assert (final["estado"], final["productos_creados"]) == ("completado", 2)
+
+def test_reclamar_respeta_el_lease(app, tienda):
+    with app.app_context():
+        viejo = datetime.datetime.utcnow() - datetime.timedelta(seconds=app.config['INGESTA_LEASE_SEGUNDOS'] + 60)
+        activo = TrabajoIngesta(tienda_id=tienda["id"], archivo="a.pdf", estado="procesando")
+        abandonado = TrabajoIngesta(tienda_id=tienda["id"], archivo="b.pdf", estado="procesando", actualizado=viejo)
+        terminado = TrabajoIngesta(tienda_id=tienda["id"], archivo="c.pdf", estado="completado", actualizado=viejo)
+        db.session.add_all([activo, abandonado, terminado])
+        db.session.commit()
+
+        assert not trabajos.reclamar_trabajo(activo.id)
+        assert trabajos.reclamar_trabajo(abandonado.id)
+        assert not trabajos.reclamar_trabajo(abandonado.id) # ya es de otro
+        assert not trabajos.reclamar_trabajo(terminado.id)
+
+def test_tienda_sin_ingestas(cliente, tienda):
+    r = cliente.get(f"/api/tienda/{tienda['slug']}/ingesta")
+    assert r.status_code == 404
+    assert cliente.get("/api/tienda/no-existe/ingesta").status_code == 404
@@ -0,0 +1,41 @@
+import io
+from PIL import Image
+from conftest import esperar_tareas
+
+def png(color="red"):
+    salida = io.BytesIO()
+    Image.new("RGB", (1200, 800), color).save(salida, "PNG")
+    salida.seek(0)
+    return salida
+
+def crear_tienda(cliente, nombre):
+    return cliente.post("/api/crear-tienda", data={
+        "nombre": nombre, "responsable": "Ana", "rif": "J-1", "email": "a@b.c",
+        "telefono": "584120000000", "direccion": "Caracas", "productos": "ropa", "color": "#000000",
+        "logo": (png(), "logo.png"),
+        "catalogo": (io.BytesIO(b"%PDF-1.4\n"), "catalogo.pdf"),
+    }, content_type="multipart/form-data")
+
+def test_logo_y_variantes_con_slug_no_ascii(app, cliente):
+    r = crear_tienda(cliente, "Café Niño")
+    assert r.status_code == 202, r.get_json()
+    slug = r.get_json()["slug"]
+    assert slug == "café-niño"
+    esperar_tareas(app)
+
+    logo = cliente.get(f"/api/tienda/{slug}").get_json()["tienda"]["logo"]
+    r = cliente.get(f"/uploads/{slug}/{logo}")
+    assert r.status_code == 200
+    assert "immutable" in r.headers["Cache-Control"]
+    r.close()
+    sha = logo.split(".")[0]
+    for variante in ("thumb.jpg", "thumb.webp", "medio.jpg", "medio.webp"):
+        r = cliente.get(f"/uploads/{slug}/{sha}-{variante}")
+        assert r.status_code == 200, variante
+        r.close()
+
+def test_no_sale_de_uploads(app, cliente, tmp_path):
+    (tmp_path / "secreto.txt").write_text("no")
+    assert cliente.get("/uploads/../secreto.txt").status_code == 404
+    assert cliente.get("/uploads/%2E%2E/secreto.txt").status_code == 404
+    assert cliente.get("/uploads/tienda/..%2Fsecreto.txt").status_code == 404
@@ -0,0 +1,183 @@
+# ───── TRABAJOS EN SEGUNDO PLANO ─────
+# Ingesta de catálogos con IA (cola persistente en trabajo_ingesta) y
+# actualización de productos relacionados tras guardar productos. Corren en el
+# ejecutor de servicios.py, cada tarea con su propio contexto de app.
+import os
+import time
+import datetime
+from flask import current_app
+import ingesta
+import busqueda
+import recomendaciones
+import respuestas
+import servicios
+from servicios import en_segundo_plano
+from modelos import db, transaccion, Tienda, Producto, TrabajoIngesta
+
+# --- Productos relacionados ---
+
+LOTE_RELACIONADOS = 100
+
+def actualizar_relacionados(ids):
+    # Tras guardar productos: si falla, el producto ya está guardado y el
+    # índice se puede rehacer con `flask reconstruir-relacionados`. Lotes
+    # cortos, cada uno en su transacción, para no bloquear a otros escritores
+    # durante una importación de miles de productos. Los productos se quitan
+    # de las listas ajenas una sola vez, antes del primer lote.
+    ids = list(ids)
+
+    def quitar():
+        recomendaciones.quitar_de_listas(db.session, ids)
+        db.session.commit()
+    pasos = [quitar]
+    for i in range(0, len(ids), LOTE_RELACIONADOS):
+        lote = ids[i:i + LOTE_RELACIONADOS]
+
+        def actualizar(lote=lote):
+            recomendaciones.actualizar_productos(
+                db.session, lote, k=current_app.config['RELACIONADOS_K'], quitar=False
+            )
+            db.session.commit()
+        pasos.append(actualizar)
+    for paso in pasos:
+        try:
+            transaccion(paso)
+        except Exception as e:
+            db.session.rollback()
+            print("Error al actualizar productos relacionados:", e)
+            return
+
+# --- Ingesta de catálogos ---
+
+def encolar_ingesta(trabajo_id):
+    return en_segundo_plano(ejecutar_ingesta, trabajo_id)
+
+def reclamar_trabajo(trabajo_id):
+    # UPDATE atómico: si varios procesos ven el mismo trabajo sólo uno lo toma.
+    # Un trabajo "procesando" sin actividad durante el lease se considera abandonado.
+    def reclamar():
+        ahora = datetime.datetime.utcnow()
+        limite = ahora - datetime.timedelta(seconds=current_app.config['INGESTA_LEASE_SEGUNDOS'])
+        resultado = db.session.execute(
+            db.update(TrabajoIngesta)
+            .where(TrabajoIngesta.id == trabajo_id)
+            .where(db.or_(
+                TrabajoIngesta.estado == "pendiente",
+                db.and_(TrabajoIngesta.estado == "procesando", TrabajoIngesta.actualizado < limite)
+            ))
+            .values(estado="procesando", fase="pdf", actualizado=ahora)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+    return transaccion(reclamar)
+
+def actualizar_trabajo(trabajo_id, **valores):
+    def actualizar():
+        db.session.execute(
+            db.update(TrabajoIngesta)
+            .where(TrabajoIngesta.id == trabajo_id)
+            .values(actualizado=datetime.datetime.utcnow(), **valores)
+        )
+        db.session.commit()
+    transaccion(actualizar)
+
+def ejecutar_ingesta(trabajo_id):
+    if not reclamar_trabajo(trabajo_id):
+        return
+    trabajo = db.session.get(TrabajoIngesta, trabajo_id)
+    tienda = db.session.get(Tienda, trabajo.tienda_id)
+    tienda_id, slug, archivo = tienda.id, tienda.slug, trabajo.archivo
+    db.session.commit()
+    metricas = servicios.actuales().metricas
+    try:
+        ultimo_guardado = 0.0
+
+        def progreso(hechas, total):
+            # Guardamos el avance como mucho dos veces por segundo
+            nonlocal ultimo_guardado
+            if hechas < total and time.monotonic() - ultimo_guardado < 0.5:
+                return
+            actualizar_trabajo(trabajo_id, paginas_total=total, paginas_procesadas=hechas)
+            ultimo_guardado = time.monotonic()
+
+        cache = ingesta.CacheIngesta(current_app.config['INGESTA_CACHE_DIR'])
+        pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], slug, archivo)
+        with metricas.cronometrar("pdf"):
+            paginas = ingesta.extraer_paginas(pdf_path, progreso, cache=cache)
+
+        actualizar_trabajo(trabajo_id, fase="ia")
+
+        def progreso_chunks(hechos, total):
+            actualizar_trabajo(trabajo_id, chunks_total=total, chunks_procesados=hechos)
+
+        with metricas.cronometrar("ia"):
+            products, errores = ingesta.extraer_productos(
+                paginas,
+                current_app.config['INGESTA_CLIENTE_IA'](),
+                cache=cache,
+                max_tokens=current_app.config['INGESTA_MAX_TOKENS_CHUNK'],
+                max_concurrencia=current_app.config['INGESTA_CONCURRENCIA'],
+                progreso=progreso_chunks
+            )
+        actualizar_trabajo(trabajo_id, fase="guardando")
+
+        # Los productos y el cierre del trabajo van en la misma transacción:
+        # si el proceso muere a mitad, el reintento no duplica productos
+        placeholder_img = os.getenv("PLACEHOLDER_IMG_URL", "https://via.placeholder.com/200")
+        nuevos_ids = []
+
+        def guardar():
+            nuevos = []
+            for prod in products:
+                nuevo_prod = Producto(
+                    nombre=prod.get("name", ""),
+                    descripcion=prod.get("description", ""),
+                    precio=prod.get("price", ""),
+                    tienda_id=tienda_id,
+                    imagen=placeholder_img
+                )
+                db.session.add(nuevo_prod)
+                nuevos.append(nuevo_prod)
+            db.session.flush()
+            busqueda.indexar_productos(db.session, [p.id for p in nuevos])
+            nuevos_ids[:] = [p.id for p in nuevos]
+            db.session.execute(
+                db.update(TrabajoIngesta)
+                .where(TrabajoIngesta.id == trabajo_id)
+                .values(
+                    productos_creados=len(products),
+                    error="\n".join(errores) or None,
+                    estado="completado",
+                    fase=None,
+                    actualizado=datetime.datetime.utcnow()
+                )
+            )
+            db.session.commit()
+
+        with metricas.cronometrar("guardando"):
+            transaccion(guardar)
+        respuestas.invalidar_tienda(slug)
+        with metricas.cronometrar("relacionados"):
+            actualizar_relacionados(nuevos_ids)
+        metricas.ingestas.inc("completado")
+
+    except Exception as iae:
+        db.session.rollback()
+        print("❌ Error IA catálogo:", iae)
+        actualizar_trabajo(trabajo_id, estado="error", error=str(iae))
+        metricas.ingestas.inc("error")
+
+def reanudar_ingestas_pendientes():
+    # Volvemos a encolar lo que quedó sin terminar (ver reanudar_ingestas en app.py)
+    try:
+        ids = db.session.scalars(
+            db.select(TrabajoIngesta.id)
+            .where(TrabajoIngesta.estado.in_(["pendiente", "procesando"]))
+            .order_by(TrabajoIngesta.id)
+        ).all()
+    except Exception as e:
+        db.session.rollback()
+        print("❌ No se pudieron reanudar las ingestas (¿falta `flask crear-esquema`?):", getattr(e, 'orig', e))
+        return
+    for trabajo_id in ids:
+        encolar_ingesta(trabajo_id)
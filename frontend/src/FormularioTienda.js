@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import ConfirmacionTienda from './ConfirmacionTienda';
+import { subirPorTrozos } from './subidas';
 
 function FormularioTienda() {
   const [tienda, setTienda] = useState(null);
@@ -9,6 +10,13 @@ function FormularioTienda() {
     const formData = new FormData(e.target);
 
     try {
+      // El catálogo puede pesar cientos de MB: va aparte, por trozos
+      const catalogo = formData.get('catalogo');
+      if (catalogo && catalogo.size) {
+        formData.set('catalogo_subida_id', await subirPorTrozos(catalogo, 'catalogo'));
+        formData.delete('catalogo');
+      }
+
       const response = await fetch('/api/crear-tienda', {
         method: 'POST',
         body: formData,
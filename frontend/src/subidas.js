@@ -0,0 +1,69 @@
+// Subida por trozos reanudable (/api/subidas): para catálogos grandes en
+// conexiones inestables. Si un trozo falla se pregunta al servidor cuántos
+// bytes llegaron y se sigue desde ahí. Al finalizar se envía el SHA-256 del
+// archivo para que el servidor compruebe que llegó íntegro. Devuelve el id de
+// la subida finalizada.
+const REINTENTOS = 5;
+
+async function json(respuesta) {
+  const datos = await respuesta.json();
+  // 409 y 422 no son fatales: el servidor indica desde dónde seguir
+  if (!datos.success && respuesta.status !== 409 && respuesta.status !== 422) {
+    throw new Error(datos.error || 'Error en la subida');
+  }
+  return datos;
+}
+
+async function sha256(archivo) {
+  // crypto.subtle sólo existe en contextos seguros (https o localhost); sin
+  // él se finaliza sin hash y el servidor no lo comprueba
+  if (!globalThis.crypto || !crypto.subtle) return null;
+  const digest = await crypto.subtle.digest('SHA-256', await archivo.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+export async function subirPorTrozos(archivo, tipo, alProgresar) {
+  const inicio = await json(await fetch('/api/subidas', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ tipo, nombre: archivo.name, tamano: archivo.size }),
+  }));
+  const id = inicio.id;
+  const tamanoTrozo = inicio.tamano_max_trozo;
+  // El hash se calcula mientras se suben los trozos
+  const hash = sha256(archivo);
+
+  let offset = 0;
+  let fallos = 0;
+  for (;;) {
+    while (offset < archivo.size) {
+      try {
+        const datos = await json(await fetch(`/api/subidas/${id}?offset=${offset}`, {
+          method: 'PUT',
+          body: archivo.slice(offset, offset + tamanoTrozo),
+        }));
+        // 409: otra petición ya confirmó ese tramo; seguimos desde donde dice el servidor
+        if (!datos.success) await new Promise((r) => setTimeout(r, 500));
+        offset = datos.recibidos;
+        fallos = 0;
+        if (alProgresar) alProgresar(offset / archivo.size);
+      } catch (error) {
+        if (++fallos > REINTENTOS) throw error;
+        await new Promise((r) => setTimeout(r, 1000 * fallos));
+        const estado = await json(await fetch(`/api/subidas/${id}`));
+        offset = estado.subida.recibidos;
+      }
+    }
+
+    // Si al finalizar el archivo no está completo en el servidor (409) o el
+    // hash no coincide (422), la subida se reinicia y se vuelve a enviar
+    const fin = await json(await fetch(`/api/subidas/${id}/finalizar`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ sha256: await hash }),
+    }));
+    if (fin.success) return id;
+    if (++fallos > REINTENTOS) throw new Error(fin.error || 'Error en la subida');
+    offset = fin.recibidos ?? 0;
+  }
+}